@@ -1,15 +1,123 @@
 from __future__ import absolute_import, unicode_literals
+import hashlib
+import json
+import logging
 import os
-from celery import Celery
+
+from celery import Celery, Task
+from django.db import OperationalError
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'crm.settings')
 
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if it still holds this run's task id
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def release_lock(cache, key, owner):
+    """
+    Compare-and-delete: a run that outlived its lock must not free the lock
+    a newer run has taken since. One Lua call with django-redis, get then
+    delete on other cache backends (local development and tests).
+    """
+    client = getattr(cache, 'client', None)
+    if hasattr(client, 'get_client'):
+        client.get_client(write=True).eval(RELEASE_LOCK_LUA, 1, client.make_key(key), client.encode(owner))
+    elif cache.get(key) == owner:
+        cache.delete(key)
+
+
+class CRMTask(Task):
+    """
+    Defaults for every task in the project (queues, priorities and the
+    rest of the settings live in CELERY_* in crm/settings.py).
+
+    - Results are ignored unless a task sets ignore_result=False.
+    - Transient database/Redis errors are retried with exponential backoff
+      and jitter: ~5s, 10s, 20s... capped at 10 minutes, 5 attempts.
+    - single_instance tasks skip a run while another run with the same
+      arguments holds the lock (e.g. beat firing again during a long scan).
+      The lock holds the task id, so the same message redelivered after a
+      worker crash runs again instead of being acked and lost.
+    - Callers can pass an idempotency key,
+          task.apply_async(args, headers={'idempotency_key': 'import-42'})
+      and the task runs at most once per key for idempotency_ttl seconds.
+    """
+    autoretry_for = (OperationalError, RedisConnectionError, RedisTimeoutError)
+    retry_backoff = 5
+    retry_backoff_max = 10 * 60
+    retry_jitter = True
+    max_retries = 5
+
+    single_instance = False
+    lock_timeout = 60 * 60             # a crashed run frees its lock after this, at least visibility_timeout
+    idempotency_ttl = 24 * 60 * 60
+
+    def idempotency_key(self, args, kwargs):
+        key = (self.request.headers or {}).get('idempotency_key')
+        if key:
+            return f"celery:idempotency:{self.name}:{key}"
+        if self.single_instance:
+            arguments = json.dumps([args, kwargs], sort_keys=True, default=str)
+            return f"celery:lock:{self.name}:{hashlib.sha1(arguments.encode()).hexdigest()}"
+        return None
+
+    def get_lock_timeout(self):
+        # A lock shorter than the broker's visibility timeout would expire
+        # under a run the broker still considers in flight
+        visibility_timeout = (self.app.conf.broker_transport_options or {}).get('visibility_timeout', 0)
+        return max(self.lock_timeout, visibility_timeout)
+
+    def _execute(self, args, kwargs):
+        # The worker (and apply()) already pushed this run's request. Going
+        # through Task.__call__ would push a blank one and break retries.
+        if self.request.called_directly:
+            return super().__call__(*args, **kwargs)
+        return self.run(*args, **kwargs)
+
+    def __call__(self, *args, **kwargs):
+        key = self.idempotency_key(args, kwargs)
+        if key is None:
+            return self._execute(args, kwargs)
+
+        from django.core.cache import cache
+
+        # add() only succeeds for the first caller, it's the lock. A message
+        # redelivered after its worker died mid-run (acks_late) finds its own
+        # task id there and re-enters.
+        task_id = self.request.id
+        owner = task_id or 'running'
+        if not cache.add(key, owner, timeout=self.get_lock_timeout()):
+            if task_id is None or cache.get(key) != task_id:
+                logger.info("Skipping %s, already running or done (%s)", self.name, key)
+                return None
+
+        try:
+            result = self._execute(args, kwargs)
+        except Exception:
+            release_lock(cache, key, owner)  # let the retry (or a new attempt) run
+            raise
+
+        if key.startswith('celery:idempotency:'):
+            cache.set(key, 'done', timeout=self.idempotency_ttl)
+        else:
+            release_lock(cache, key, owner)
+        return result
+
+
 # Create the Celery application instance
-app = Celery('crm')
+app = Celery('crm', task_cls=CRMTask)
 
 # Load configuration from Django settings, using a namespace 'CELERY'
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Automatically discover tasks in all registered Django app configs
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
@@ -17,10 +17,13 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'leads',
     'rest_framework',
+    'rest_framework.authtoken',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'leads.middleware.CompressionMiddleware',  # first to see the finished response body
+    'leads.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -35,8 +38,16 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept in memory. Spelled out (it's also
+            # Django's default) so adding a loader can't silently drop caching.
+            # With DEBUG the cache is reset when a template file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
@@ -47,6 +58,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'crm.wsgi.application'
+ASGI_APPLICATION = 'crm.asgi.application'  # serves the dashboard SSE stream
 
 # Switching to postgres database
 """
@@ -68,6 +80,27 @@ DATABASES = {
     }
 }
 
+# Read replicas (see leads/db_router.py), e.g. POSTGRES_REPLICA_HOSTS=pg-replica-1,pg-replica-2
+REPLICA_DATABASES = []
+for number, host in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(alias)
+
+# Local second database in place of streaming replicas, e.g. LOCAL_REPLICA_SQLITE=replica.sqlite3
+# adds that file as replica1. Nothing replicates into it: it's migrated like the primary
+# (migrate --database replica1) and holds whatever is loaded into it. Also what the
+# router's two-database test runs against.
+LOCAL_REPLICA_SQLITE = os.environ.get('LOCAL_REPLICA_SQLITE', '')
+if LOCAL_REPLICA_SQLITE and not REPLICA_DATABASES:
+    DATABASES['replica1'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / LOCAL_REPLICA_SQLITE}
+    REPLICA_DATABASES.append('replica1')
+
+DATABASE_ROUTERS = ['leads.db_router.ReplicaRouter']
+REPLICA_MAX_LAG = 5              # seconds behind the primary before a replica is skipped
+REPLICA_LAG_CHECK_INTERVAL = 10  # seconds between lag checks, per process and replica
+REPLICA_STICKY_SECONDS = 15      # a user reads from the primary this long after their own write
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -99,13 +132,140 @@ CACHES = {
         'OPTIONS': {
             'CLIENT_CLASS': 'django_redis.client.DefaultClient',
         }
-    }
+    },
+    # Sessions get their own Redis database, so clearing or evicting
+    # cached pages never logs anybody out
+    'sessions': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', 6379)}/3",
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        }
+    },
+}
+
+# Sessions are read from Redis and written through to the database (cached_db).
+# SESSION_ENGINE=django.contrib.sessions.backends.cache keeps them in Redis only.
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+# request.user comes from the cache instead of a query per request (see leads/auth.py)
+AUTHENTICATION_BACKENDS = ['leads.auth.CachedModelBackend']
+AUTH_USER_CACHE_TIMEOUT = 300  # seconds
+
+# Django REST Framework
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.TokenAuthentication',  # integrations: "Authorization: Token <key>"
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': ['leads.throttling.TokenBucketThrottle'],
+}
+
+# Write API (see leads/api_views.py)
+LEAD_API_BATCH_LIMIT = 1000  # leads per batch-create request
+# Response types compressed with brotli/gzip (never HTML, see leads/middleware.py)
+LEAD_COMPRESS_CONTENT_TYPES = ['application/json', 'application/x-ndjson', 'application/msgpack']
+
+# API token buckets (see leads/throttling.py)
+LEAD_API_THROTTLE = {
+    # (bucket size, refill in tokens per second) per kind of client
+    'rates': {
+        'token': (600, 10.0),  # integrations
+        'user': (120, 2.0),    # browser sessions
+        'anon': (20, 0.2),
+    },
+    # tokens spent per request, by the view's throttle_endpoint
+    'costs': {
+        'default': 1,
+        'lead_list': 1,
+        'lead_list_unfiltered': 10,  # whole table, no search or status filter
+        'analytics': 2,
+        'lead_create': 1,
+        'lead_batch_create': 20,  # up to LEAD_API_BATCH_LIMIT rows
+    },
 }
 
-# Celery configuration
-CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+# Live dashboard updates (Redis pub/sub → Server-Sent Events)
+LEAD_EVENTS_REDIS_URL = f"redis://{os.environ.get('REDIS_HOST', 'redis')}:{os.environ.get('REDIS_PORT', 6379)}/2"
+LEAD_EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments on idle streams
+
+# Automatic lead assignment (see leads/assignment.py)
+LEAD_AUTO_ASSIGN = True
+LEAD_ASSIGNMENT_STRATEGY = os.environ.get('LEAD_ASSIGNMENT_STRATEGY', 'least_loaded')  # round_robin | least_loaded | weighted
+
+# Row-level lead visibility (see leads/scoping.py)
+LEAD_SCOPE_SESSION_TTL = 300  # seconds a user's scope/permissions stay cached in the session
+
+# Rendered lead table/pagination fragments (see leads/fragments.py), 0 disables them
+LEAD_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('LEAD_FRAGMENT_CACHE_TIMEOUT', 300))
+
+# Celery configuration (task defaults: see crm/celery.py)
+# CELERY_TASK_ALWAYS_EAGER=True runs tasks inline with an in-memory broker, for tests
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_EAGER_PROPAGATES = True  # eager task errors raise in the caller
+CELERY_BROKER_URL = 'memory://' if CELERY_TASK_ALWAYS_EAGER else os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 #CELERY_BROKER_URL = 'redis://redis:6379/0'  # Redis broker URL (redis is the name of the Redis container in Docker)
 CELERY_ACCEPT_CONTENT = ['json']  # Ensures that the data sent to Celery is serialized as JSON
 CELERY_TASK_SERIALIZER = 'json'  # Task serialization format
-CELERY_RESULT_BACKEND = 'redis://redis:6379/0'  # Where Celery will store results
-CELERY_TIMEZONE = 'UTC'  # You can change this to your preferred timezone
\ No newline at end of file
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')  # Where Celery will store results
+CELERY_TASK_IGNORE_RESULT = True  # fire-and-forget by default, tasks that need a result set ignore_result=False
+CELERY_RESULT_EXPIRES = 60 * 60   # seconds kept results live in Redis
+CELERY_TIMEZONE = 'UTC'  # You can change this to your preferred timezone
+
+# Queues: 'default' for latency-sensitive work, 'bulk' for batch/import/export jobs.
+# Each queue has its own worker (see docker-compose.yml) so heavy jobs can't starve quick ones.
+CELERY_TASK_DEFAULT_QUEUE = 'default'
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_TASK_ROUTES = {
+    # priority 0 is the most urgent with the Redis broker
+    'leads.tasks.send_due_reminders': {'queue': 'default', 'priority': 0},
+    # scans the whole backlog, queued after every batch import and by beat
+    'leads.tasks.assign_unassigned_leads': {'queue': 'bulk', 'priority': 2},
+    'leads.tasks.update_analytics_rollups': {'queue': 'bulk', 'priority': 3},
+    'leads.tasks.recompute_lead_scores': {'queue': 'bulk', 'priority': 5},
+    'leads.tasks.rebuild_assignment_loads': {'queue': 'bulk', 'priority': 5},
+    'leads.tasks.scan_for_duplicates': {'queue': 'bulk', 'priority': 7},
+    'leads.tasks.clear_expired_sessions': {'queue': 'bulk', 'priority': 9},
+}
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'visibility_timeout': 2 * 60 * 60,  # longer than the slowest bulk job, or it gets redelivered mid-run
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1  # reserve one task per process, not four, so priorities apply
+CELERY_TASK_ACKS_LATE = True           # a crashed worker's task is redelivered (tasks must be idempotent)
+CELERY_TASK_REJECT_ON_WORKER_LOST = True
+
+# Periodic tasks run by `celery -A crm beat`
+CELERY_BEAT_SCHEDULE = {
+    'send-due-reminders': {
+        'task': 'leads.tasks.send_due_reminders',
+        'schedule': 60.0,  # every minute
+    },
+    'recompute-lead-scores': {
+        'task': 'leads.tasks.recompute_lead_scores',
+        'schedule': 15 * 60.0,
+    },
+    'assign-unassigned-leads': {
+        'task': 'leads.tasks.assign_unassigned_leads',
+        'schedule': 5 * 60.0,
+    },
+    'update-analytics-rollups': {
+        'task': 'leads.tasks.update_analytics_rollups',
+        'schedule': 5 * 60.0,
+    },
+    'scan-for-duplicates': {
+        'task': 'leads.tasks.scan_for_duplicates',
+        'schedule': 24 * 60 * 60.0,  # nightly
+    },
+    'rebuild-assignment-loads': {
+        'task': 'leads.tasks.rebuild_assignment_loads',
+        'schedule': 60 * 60.0,
+    },
+    'clear-expired-sessions': {
+        'task': 'leads.tasks.clear_expired_sessions',
+        'schedule': 24 * 60 * 60.0,  # nightly
+    },
+}
@@ -1,9 +1,14 @@
 from django.contrib import admin
-from .models import Lead
+from .models import AssignmentProfile, Lead
 
 @admin.register(Lead)
 class LeadAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email', 'phone', 'status', 'assigned_to', 'created_at')
+    list_display = ('name', 'email', 'phone', 'status', 'score', 'assigned_to', 'created_at')
     list_filter = ('status', 'assigned_to')
     search_fields = ('name', 'email', 'phone')
 
+
+@admin.register(AssignmentProfile)
+class AssignmentProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'capacity', 'accepts_leads')
+    list_filter = ('accepts_leads',)
@@ -0,0 +1,154 @@
+"""
+Funnel and conversion analytics.
+
+Views record a StatusTransition row for every status change. The
+update_analytics_rollups Celery task folds new transitions into
+DailyStatusRollup (one row per day / user / from → to status), and the
+analytics API only ever reads those rollups, so a funnel over years of
+history aggregates a few thousand small rows instead of scanning events.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyStatusRollup, Lead, RollupWatermark, StatusTransition
+
+WATERMARK_NAME = 'status_transitions'
+BATCH_SIZE = 10000
+# Transitions younger than this are left for the next run, so a slow transaction
+# that got a lower id but commits late isn't skipped by the watermark.
+SAFETY_LAG = timedelta(minutes=1)
+
+
+def record_transition(lead, from_status, to_status, user=None):
+    """
+    Store a structured status change and stamp lead.status_changed_at.
+    from_status is '' when the lead is created.
+    """
+    now = timezone.now()
+    seconds = None
+    if from_status:
+        since = lead.status_changed_at or lead.created_at
+        seconds = max(int((now - since).total_seconds()), 0)
+
+    StatusTransition.objects.create(
+        lead=lead,
+        user=user,
+        from_status=from_status,
+        to_status=to_status,
+        seconds_in_from_status=seconds,
+    )
+    lead.status_changed_at = now
+    Lead.objects.filter(pk=lead.pk).update(status_changed_at=now)
+
+
+def _apply_batch(watermark, batch_size):
+    """Fold the next batch of transitions into the rollups. Returns rows consumed."""
+    cutoff = timezone.now() - SAFETY_LAG
+    ids = list(
+        StatusTransition.objects.filter(pk__gt=watermark.last_id, created_at__lt=cutoff)
+        .order_by('pk').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0
+
+    groups = (
+        StatusTransition.objects.filter(pk__gt=watermark.last_id, pk__lte=ids[-1])
+        .annotate(day=TruncDate('created_at'))
+        .order_by().values('day', 'user_id', 'from_status', 'to_status')
+        .annotate(n=Count('id'), seconds=Sum('seconds_in_from_status'))
+    )
+    for group in groups:
+        key = {
+            'day': group['day'],
+            'user_id': group['user_id'],
+            'from_status': group['from_status'],
+            'to_status': group['to_status'],
+        }
+        increments = {
+            'transitions': F('transitions') + group['n'],
+            'total_seconds_in_from_status': F('total_seconds_in_from_status') + (group['seconds'] or 0),
+        }
+        # Only one run holds the watermark lock, so update-then-create can't race
+        if not DailyStatusRollup.objects.filter(**key).update(**increments):
+            DailyStatusRollup.objects.create(
+                transitions=group['n'],
+                total_seconds_in_from_status=group['seconds'] or 0,
+                **key,
+            )
+
+    watermark.last_id = ids[-1]
+    watermark.save(update_fields=['last_id'])
+    return len(ids)
+
+
+def update_rollups(batch_size=BATCH_SIZE):
+    """
+    Incrementally fold new StatusTransition rows into DailyStatusRollup.
+
+    Each batch runs in its own transaction holding a row lock on the
+    watermark, so concurrent runs queue up instead of double counting.
+    Returns the number of transitions processed.
+    """
+    processed = 0
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK_NAME)
+            consumed = _apply_batch(watermark, batch_size)
+        processed += consumed
+        if consumed < batch_size:
+            return processed
+
+
+def funnel_summary(start, end):
+    """
+    Funnel, conversion, time-in-status and per-rep throughput between two
+    dates (inclusive), computed from DailyStatusRollup only.
+    """
+    rollups = DailyStatusRollup.objects.filter(day__gte=start, day__lte=end)
+
+    entered = dict(
+        rollups.order_by().values('to_status')
+        .annotate(n=Sum('transitions')).values_list('to_status', 'n')
+    )
+    created = rollups.filter(from_status='').aggregate(n=Sum('transitions'))['n'] or 0
+
+    time_in_status = {
+        row['from_status']: round(row['seconds'] / row['n'] / 3600, 2) if row['n'] else None
+        for row in rollups.exclude(from_status='').order_by().values('from_status')
+        .annotate(n=Sum('transitions'), seconds=Sum('total_seconds_in_from_status'))
+    }
+
+    per_rep = [
+        {
+            'user_id': row['user_id'],
+            'username': row['user__username'],
+            'transitions': row['moved'],
+            'converted': row['converted'] or 0,
+        }
+        for row in rollups.order_by().values('user_id', 'user__username')
+        .annotate(
+            moved=Sum('transitions'),
+            converted=Sum('transitions', filter=Q(to_status='converted')),
+        )
+        .order_by(F('converted').desc(nulls_last=True), 'user_id')
+    ]
+
+    daily = list(
+        rollups.order_by('day').values('day', 'to_status')
+        .annotate(n=Sum('transitions'))
+    )
+
+    return {
+        'from': start,
+        'to': end,
+        'created': created,
+        'entered': entered,
+        'conversion_rate': round(entered.get('converted', 0) / created, 4) if created else None,
+        'avg_hours_in_status': time_in_status,
+        'per_rep': per_rep,
+        'daily': daily,
+    }
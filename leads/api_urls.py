@@ -1,7 +1,17 @@
-from .api_views import LeadListAPIView
+from .api_views import (
+    FollowUpCreateAPIView, FunnelAnalyticsAPIView, LeadBatchCreateAPIView,
+    LeadDetailAPIView, LeadListAPIView, ThrottleMetricsAPIView,
+)
 from django.urls import path
+from rest_framework.authtoken.views import obtain_auth_token
 
 urlpatterns = [
      # API Endpoints
     path('', LeadListAPIView.as_view(), name='api_lead_list'), # leads/  --> inherits from crm/urls.py
+    path('batch/', LeadBatchCreateAPIView.as_view(), name='api_lead_batch_create'),
+    path('<int:pk>/', LeadDetailAPIView.as_view(), name='api_lead_detail'),
+    path('<int:pk>/followups/', FollowUpCreateAPIView.as_view(), name='api_lead_followup_create'),
+    path('token/', obtain_auth_token, name='api_token'),  # POST username/password -> {'token': ...}
+    path('analytics/', FunnelAnalyticsAPIView.as_view(), name='api_funnel_analytics'),
+    path('throttle-metrics/', ThrottleMetricsAPIView.as_view(), name='api_throttle_metrics'),
 ]
\ No newline at end of file
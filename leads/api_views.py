@@ -1,20 +1,82 @@
+from datetime import timedelta
+
 # DRF imports
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
 # Django ORM imports
 from django.db.models import OuterRef, Subquery, Q
+from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 # models and serializer
 from .models import Lead, FollowUp
-from .serializers import LeadSerializer
+from .serializers import FollowUpSerializer, LeadSerializer, LeadWriteSerializer
+from .analytics import funnel_summary
+from .db_router import replica_reads
+from .renderers import COMPACT_PARSERS, COMPACT_RENDERERS
+from .scoping import get_scope, has_lead_perm, scope_leads
+from .services import DuplicateEmailError, add_followup, create_lead, create_leads_bulk, update_lead
+from .throttling import rejection_counts
 
-class LeadListAPIView(generics.ListAPIView):
-    serializer_class = LeadSerializer
-    permission_classes = [permissions.IsAuthenticated]
+
+class LeadPermission(permissions.BasePermission):
+    """
+    Same model permissions as the HTML views, per HTTP method
+    (view.required_perms, e.g. {'POST': 'leads.add_lead'}).
+    """
+
+    def has_permission(self, request, view):
+        perm = getattr(view, 'required_perms', {}).get(request.method)
+        return perm is None or has_lead_perm(request, perm)
+
+
+class EmailConflict(APIException):
+    """409 for emails taken by a concurrent request between validation and insert."""
+    status_code = status.HTTP_409_CONFLICT
+
+    def __init__(self, emails):
+        super().__init__({'detail': "Leads with these emails already exist.", 'emails': emails})
+
+
+class LeadAPIMixin:
+    """Token or session auth, plain JSON plus the compact encodings (see leads/renderers.py)."""
+    permission_classes = [permissions.IsAuthenticated, LeadPermission]
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COMPACT_RENDERERS
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES + COMPACT_PARSERS
+
+
+@method_decorator(replica_reads, name='get')
+class LeadListAPIView(LeadAPIMixin, generics.ListCreateAPIView):
+    required_perms = {'POST': 'leads.add_lead'}
+
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return LeadWriteSerializer
+        return LeadSerializer
+
+    def perform_create(self, serializer):
+        try:
+            lead, _ = create_lead(self.request.user, **serializer.validated_data)
+        except DuplicateEmailError as error:
+            raise EmailConflict(error.emails)
+        serializer.instance = lead
+
+    def get_throttle_endpoint(self, request):
+        if request.method == 'POST':
+            return 'lead_create'
+        # Unfiltered requests return the whole table and cost more
+        if request.GET.get('q') or request.GET.get('status'):
+            return 'lead_list'
+        return 'lead_list_unfiltered'
 
     def get_queryset(self):
-        queryset = Lead.objects.filter(is_deleted=False).order_by('-id')
+        queryset = scope_leads(Lead.objects.filter(is_deleted=False), get_scope(self.request)).order_by('-id')
 
         # Search Functionality
         query = self.request.GET.get('q', '')
@@ -44,4 +106,89 @@ class LeadListAPIView(generics.ListAPIView):
         )
         
         return queryset
-    
\ No newline at end of file
+
+
+class LeadBatchCreateAPIView(LeadAPIMixin, APIView):
+    """
+    Create up to LEAD_API_BATCH_LIMIT leads from a JSON/NDJSON/MessagePack list,
+    all or nothing. Returns {'created': n, 'ids': [...]}.
+    """
+    required_perms = {'POST': 'leads.add_lead'}
+    throttle_endpoint = 'lead_batch_create'
+
+    def post(self, request):
+        serializer = LeadWriteSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            leads = create_leads_bulk(request.user, serializer.validated_data)
+        except DuplicateEmailError as error:
+            raise EmailConflict(error.emails)
+        return Response(
+            {'created': len(leads), 'ids': [lead.pk for lead in leads]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class LeadDetailAPIView(LeadAPIMixin, generics.RetrieveUpdateAPIView):
+    """GET or PATCH one lead the user can see. PUT isn't offered, updates are partial."""
+    serializer_class = LeadWriteSerializer
+    required_perms = {'PATCH': 'leads.change_lead'}
+    http_method_names = ['get', 'patch', 'head', 'options']
+
+    def get_queryset(self):
+        return scope_leads(Lead.objects.filter(is_deleted=False), get_scope(self.request))
+
+    def perform_update(self, serializer):
+        try:
+            update_lead(serializer.instance, self.request.user, serializer.validated_data)
+        except DuplicateEmailError as error:
+            raise EmailConflict(error.emails)
+
+
+class FollowUpCreateAPIView(LeadAPIMixin, generics.CreateAPIView):
+    serializer_class = FollowUpSerializer
+    required_perms = {'POST': 'leads.change_lead'}
+
+    def perform_create(self, serializer):
+        queryset = scope_leads(Lead.objects.filter(is_deleted=False), get_scope(self.request))
+        lead = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        serializer.instance = add_followup(lead, self.request.user, serializer.validated_data['comment'])
+
+
+@method_decorator(replica_reads, name='get')
+class FunnelAnalyticsAPIView(APIView):
+    """
+    Funnel/conversion analytics for ?from=YYYY-MM-DD&to=YYYY-MM-DD
+    (default: last 30 days). Reads only the daily rollup tables.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_endpoint = 'analytics'
+
+    def get(self, request):
+        today = timezone.localdate()
+        start = today - timedelta(days=30)
+        end = today
+        try:
+            # parse_date returns None for text that isn't a date at all,
+            # and raises for well-formed but impossible ones (2024-02-30)
+            if request.GET.get('from'):
+                start = parse_date(request.GET['from'])
+            if request.GET.get('to'):
+                end = parse_date(request.GET['to'])
+        except ValueError:
+            start = None
+        if start is None or end is None:
+            return Response({'detail': 'Dates must be valid YYYY-MM-DD.'}, status=status.HTTP_400_BAD_REQUEST)
+        if end < start:
+            return Response({'detail': "'to' must not be before 'from'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(funnel_summary(start, end))
+
+
+class ThrottleMetricsAPIView(APIView):
+    """Rejected requests per endpoint, for monitoring."""
+    permission_classes = [permissions.IsAdminUser]
+    throttle_classes = []  # monitoring must keep working while clients are throttled
+
+    def get(self, request):
+        return Response({'rejections': rejection_counts()})
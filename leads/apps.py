@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class LeadsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'leads'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from .auth import forget_user
+
+        # drop cached copies of a user when the row changes (see leads/auth.py)
+        post_save.connect(forget_user, sender=get_user_model(), dispatch_uid='leads_forget_user_save')
+        post_delete.connect(forget_user, sender=get_user_model(), dispatch_uid='leads_forget_user_delete')
@@ -0,0 +1,204 @@
+"""
+Automatic lead assignment.
+
+New leads are handed to active staff users using one of three strategies
+(settings.LEAD_ASSIGNMENT_STRATEGY):
+
+    round_robin   → take turns in user id order
+    least_loaded  → the user with the fewest open leads
+    weighted      → fewest open leads relative to AssignmentProfile.capacity
+
+Open-lead counts per user live in the cache (Redis in production) and are
+moved with atomic incr/decr, so picking an assignee never runs a COUNT and
+never locks a user row. rebuild_loads() re-seeds them from the database.
+"""
+import heapq
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count
+
+from .events import publish_assignment_event
+from .models import Lead
+
+OPEN_STATUSES = ('new', 'in_progress')
+
+LOAD_CACHE_KEY = "assignment_load_{}"
+LOADS_SEEDED_KEY = "assignment_loads_seeded"
+ROUND_ROBIN_KEY = "assignment_round_robin"
+LOAD_TIMEOUT = None  # counters never expire, rebuild_loads() keeps them honest
+
+
+def get_candidates():
+    """
+    Active staff users that accept leads, as {user_id: capacity}.
+    Users without an AssignmentProfile accept leads with capacity 1.
+    """
+    rows = (
+        User.objects.filter(is_staff=True, is_active=True)
+        .exclude(assignment_profile__accepts_leads=False)
+        .order_by('id')
+        .values_list('id', 'assignment_profile__capacity')
+    )
+    return {user_id: capacity or 1 for user_id, capacity in rows}
+
+
+def is_open(status, is_deleted=False):
+    return status in OPEN_STATUSES and not is_deleted
+
+
+def rebuild_loads():
+    """Re-seed every load counter from one GROUP BY over open leads."""
+    loads = dict(
+        Lead.objects.filter(status__in=OPEN_STATUSES, is_deleted=False, assigned_to__isnull=False)
+        .order_by().values('assigned_to')
+        .annotate(n=Count('id'))
+        .values_list('assigned_to', 'n')
+    )
+    candidates = get_candidates()
+    cache.set_many(
+        {LOAD_CACHE_KEY.format(user_id): loads.get(user_id, 0) for user_id in set(candidates) | set(loads)},
+        timeout=LOAD_TIMEOUT,
+    )
+    cache.set(LOADS_SEEDED_KEY, True, timeout=LOAD_TIMEOUT)
+    return loads
+
+
+def get_loads(user_ids):
+    """Current open-lead count per user, one cache round trip."""
+    if not cache.get(LOADS_SEEDED_KEY):
+        rebuild_loads()
+    keys = {LOAD_CACHE_KEY.format(user_id): user_id for user_id in user_ids}
+    found = cache.get_many(list(keys))
+    return {user_id: found.get(key, 0) for key, user_id in keys.items()}
+
+
+def adjust_load(user_id, delta):
+    """Atomically move a user's open-lead counter (no-op for unassigned leads)."""
+    if not user_id or not delta:
+        return
+    key = LOAD_CACHE_KEY.format(user_id)
+    # add() only sets the key if it's missing, so concurrent callers can't reset it
+    cache.add(key, 0, timeout=LOAD_TIMEOUT)
+    if delta > 0:
+        cache.incr(key, delta)
+    else:
+        cache.decr(key, -delta)
+
+
+def pick_assignee(candidates, loads, strategy=None):
+    """Choose one user id from {user_id: capacity} given {user_id: load}."""
+    strategy = strategy or settings.LEAD_ASSIGNMENT_STRATEGY
+    user_ids = sorted(candidates)
+
+    if strategy == 'round_robin':
+        cache.add(ROUND_ROBIN_KEY, 0, timeout=None)
+        turn = cache.incr(ROUND_ROBIN_KEY)
+        return user_ids[turn % len(user_ids)]
+
+    if strategy == 'weighted':
+        return min(user_ids, key=lambda user_id: (loads[user_id] / candidates[user_id], user_id))
+
+    # least_loaded
+    return min(user_ids, key=lambda user_id: (loads[user_id], user_id))
+
+
+def assign_lead(lead, strategy=None):
+    """
+    Assign one unassigned lead. Returns the chosen user id, or None when there
+    is nobody to assign to or another worker assigned the lead first.
+    """
+    candidates = get_candidates()
+    if not candidates:
+        return None
+
+    user_id = pick_assignee(candidates, get_loads(candidates), strategy)
+
+    # Conditional update: only one concurrent assigner can win the lead
+    won = Lead.objects.filter(pk=lead.pk, assigned_to__isnull=True).update(assigned_to_id=user_id)
+    if not won:
+        return None
+
+    lead.assigned_to_id = user_id
+    if is_open(lead.status, lead.is_deleted):
+        adjust_load(user_id, 1)
+    return user_id
+
+
+def assign_backlog(batch_size=500, strategy=None):
+    """
+    Assign every unassigned open lead, oldest first.
+
+    Loads are read once and tracked in memory while planning each batch, then
+    each user's share is written with a single conditional UPDATE. Once done,
+    one event tells dashboards (and the list fragment cache) which pool leads
+    now belong to someone. Returns the number of leads assigned.
+    """
+    strategy = strategy or settings.LEAD_ASSIGNMENT_STRATEGY
+    candidates = get_candidates()
+    if not candidates:
+        return 0
+
+    loads = get_loads(candidates)
+    assigned = 0
+    last_id = 0
+    groups = {}  # {(assigned_to, created_by, status): count} for the event
+
+    while True:
+        lead_ids = list(
+            Lead.objects.filter(
+                status__in=OPEN_STATUSES, is_deleted=False,
+                assigned_to__isnull=True, pk__gt=last_id,
+            ).order_by('pk').values_list('id', flat=True)[:batch_size]
+        )
+        if not lead_ids:
+            break
+
+        plan = {user_id: [] for user_id in candidates}
+        if strategy == 'round_robin':
+            # reserve a block of turns with one incr instead of one per lead
+            user_ids = sorted(candidates)
+            cache.add(ROUND_ROBIN_KEY, 0, timeout=None)
+            first_turn = cache.incr(ROUND_ROBIN_KEY, len(lead_ids)) - len(lead_ids) + 1
+            for offset, lead_id in enumerate(lead_ids):
+                plan[user_ids[(first_turn + offset) % len(user_ids)]].append(lead_id)
+        else:
+            # heap keyed on (load / capacity) gives the next assignee in O(log n)
+            weight = (lambda user_id: candidates[user_id]) if strategy == 'weighted' else (lambda user_id: 1)
+            heap = [(loads[user_id] / weight(user_id), user_id) for user_id in candidates]
+            heapq.heapify(heap)
+            planned = dict(loads)
+            for lead_id in lead_ids:
+                _, user_id = heapq.heappop(heap)
+                plan[user_id].append(lead_id)
+                planned[user_id] += 1
+                heapq.heappush(heap, (planned[user_id] / weight(user_id), user_id))
+
+        winners = []
+        for user_id, ids in plan.items():
+            if not ids:
+                continue
+            won = Lead.objects.filter(pk__in=ids, assigned_to__isnull=True).update(assigned_to_id=user_id)
+            adjust_load(user_id, won)
+            loads[user_id] += won
+            assigned += won
+            if won:
+                winners.append(user_id)
+
+        if winners:
+            rows = (
+                Lead.objects.filter(pk__in=lead_ids, assigned_to_id__in=winners)
+                .values_list('assigned_to_id', 'created_by_id', 'status')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            for assigned_to, created_by, status, count in rows:
+                key = (assigned_to, created_by, status)
+                groups[key] = groups.get(key, 0) + count
+
+        last_id = lead_ids[-1]
+
+    if groups:
+        publish_assignment_event(groups)
+    return assigned
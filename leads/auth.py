@@ -0,0 +1,35 @@
+"""
+Authentication hot path.
+
+AuthenticationMiddleware loads request.user from the database on every
+request. CachedModelBackend keeps each user in the cache for
+AUTH_USER_CACHE_TIMEOUT seconds instead. The cached copy is dropped
+whenever the user row is saved or deleted (connected in LeadsConfig.ready),
+so password changes, logins and deactivations through the ORM apply at
+once. Queryset .update() calls bypass that and wait for the timeout.
+
+Django still checks the session's password hash against the cached user,
+so a stale copy can only log someone out, never in.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        key = USER_CACHE_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            # also rejects inactive users (user_can_authenticate)
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout=settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
+
+
+def forget_user(sender, instance, **kwargs):
+    cache.delete(USER_CACHE_KEY.format(instance.pk))
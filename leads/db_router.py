@@ -0,0 +1,171 @@
+"""
+Read-replica routing.
+
+Writes always go to `default`. Reads go to a replica only inside views
+decorated with @replica_reads (lead list, dashboard, read-only API), and
+only when:
+
+  * the request isn't pinned: a user who wrote something in the last
+    REPLICA_STICKY_SECONDS reads from the primary (read-your-writes), which
+    ReplicaRoutingMiddleware tracks with a timestamp cookie;
+  * no transaction is open on the primary;
+  * the replica is fresh: its lag is checked at most every
+    REPLICA_LAG_CHECK_INTERVAL seconds and replicas lagging more than
+    REPLICA_MAX_LAG seconds (or unreachable) are skipped.
+
+One replica is picked per request so its reads are consistent with each
+other. Celery tasks and management commands have no request state and
+always use the primary.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'crm_last_write'
+
+# Postgres reports no replay timestamp on a primary; on an idle replica
+# that has replayed everything the timestamp is old but the lag is zero.
+LAG_SQL = """
+SELECT CASE
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END
+"""
+
+# Per-request routing state, set by ReplicaRoutingMiddleware
+_request_state = ContextVar('replica_request_state', default=None)
+# True while a @replica_reads view runs
+_replica_reads = ContextVar('replica_reads', default=False)
+
+# {alias: (monotonic time the check expires, fresh?)}
+_freshness = {}
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0  # e.g. two SQLite files in local testing
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def is_fresh(alias):
+    """Whether the replica is reachable and within REPLICA_MAX_LAG, cached per process."""
+    now = time.monotonic()
+    cached = _freshness.get(alias)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    try:
+        lag = replica_lag(alias)
+    except DatabaseError:
+        logger.warning("Replica %s unreachable, reading from the primary", alias)
+        fresh = False
+    else:
+        fresh = lag <= settings.REPLICA_MAX_LAG
+        if not fresh:
+            logger.warning("Replica %s is %.1fs behind, reading from the primary", alias, lag)
+
+    _freshness[alias] = (now + settings.REPLICA_LAG_CHECK_INTERVAL, fresh)
+    return fresh
+
+
+def choose_replica():
+    """A fresh replica alias at random, or the primary if none is."""
+    fresh = [alias for alias in settings.REPLICA_DATABASES if is_fresh(alias)]
+    return random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    """Let a read-only view's queries go to a replica (see module docstring)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def recently_wrote(request):
+    try:
+        last_write = float(request.COOKIES.get(STICKY_COOKIE, 0))
+    except ValueError:
+        return False
+    return time.time() - last_write < settings.REPLICA_STICKY_SECONDS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Holds the routing state of each request, and sets the sticky cookie
+    when the request wrote to the primary so the user's next reads see it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'pinned': recently_wrote(request), 'wrote': False, 'alias': None}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+
+        if state['wrote']:
+            response.set_cookie(
+                STICKY_COOKIE,
+                str(time.time()),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if (
+            state is None
+            or state['pinned']
+            or not _replica_reads.get()
+            or not settings.REPLICA_DATABASES
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+
+        if state['alias'] is None:
+            state['alias'] = choose_replica()
+        return state['alias']
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        # saving the session on every request isn't a write the user would read back
+        if state is not None and model._meta.app_label != 'sessions':
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # streaming replicas get the schema through replication, a local
+        # SQLite stand-in (LOCAL_REPLICA_SQLITE) has to be migrated itself
+        if db in settings.REPLICA_DATABASES and settings.DATABASES.get(db, {}).get('ENGINE') != 'django.db.backends.sqlite3':
+            return False
+        return None
@@ -0,0 +1,304 @@
+"""
+Duplicate lead detection.
+
+Every lead gets a few normalized match keys (LeadMatchKey):
+
+    email → lowercased, "+tag" dropped, dots ignored for Gmail
+    phone → digits only, last 10 digits
+    name  → Soundex codes of the first and last name, order independent
+
+Candidates are the leads sharing at least one key (an indexed lookup), and
+only those are compared with a fuzzy score. A name match alone is never a
+duplicate (two John Smiths are common), but a strongly similar name plus
+partial contact evidence is: the same mailbox name at another domain, or
+the same 7-digit number with another area code. That is what the name
+block finds that the email and phone blocks can't. That keeps detection per lead
+independent of the table size, both on create and in the batch scan.
+"""
+import unicodedata
+from difflib import SequenceMatcher
+
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .assignment import adjust_load, is_open
+from .events import publish_lead_event
+from .models import ActionLog, DuplicateCandidate, FollowUp, Lead, LeadMatchKey, Reminder, StatusTransition
+
+# Weight of each signal, a pair is flagged at DUPLICATE_THRESHOLD or above:
+# same email alone is enough, same phone needs a similar name too, and a
+# near-identical name needs partial email or phone evidence
+EMAIL_WEIGHT = 0.6
+PHONE_WEIGHT = 0.5
+NAME_WEIGHT = 0.4
+EMAIL_LOCAL_WEIGHT = 0.25  # same part before the @, dots ignored, other domain
+PHONE_LOCAL_WEIGHT = 0.25  # same last 7 digits, other area code
+NAME_MIN_SIMILARITY = 0.5  # below this names count as unrelated
+STRONG_NAME_SIMILARITY = 0.8  # partial contact evidence only counts above this
+DUPLICATE_THRESHOLD = 0.6
+
+# Very common keys (e.g. a popular surname pair) produce huge blocks that
+# carry little signal, only the newest this many candidates are compared per
+# key (duplicates are usually entered close together)
+MAX_BLOCK_SIZE = 200
+CHUNK_SIZE = 1000
+
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+
+SOUNDEX_CODES = {
+    letter: digit
+    for digit, letters in {'1': 'BFPV', '2': 'CGJKQSXZ', '3': 'DT', '4': 'L', '5': 'MN', '6': 'R'}.items()
+    for letter in letters
+}
+
+
+def normalize_email(email):
+    email = (email or '').strip().lower()
+    if '@' not in email:
+        return email
+    local, domain = email.rsplit('@', 1)
+    local = local.split('+', 1)[0]
+    if domain in GMAIL_DOMAINS:
+        local = local.replace('.', '')
+        domain = 'gmail.com'
+    return f"{local}@{domain}"
+
+
+def normalize_phone(phone):
+    digits = ''.join(c for c in (phone or '') if c.isdigit())
+    return digits[-10:]
+
+
+def email_local_part(email):
+    """Normalized mailbox name without dots, '' if there is no @."""
+    email = normalize_email(email)
+    if '@' not in email:
+        return ''
+    return email.rsplit('@', 1)[0].replace('.', '')
+
+
+def name_tokens(name):
+    """Lowercase ASCII words of a name, accents stripped."""
+    ascii_name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    return [token for token in ''.join(c if c.isalpha() else ' ' for c in ascii_name.lower()).split() if token]
+
+
+def soundex(word):
+    word = word.upper()
+    if not word:
+        return ''
+    code = word[0]
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        digit = SOUNDEX_CODES.get(letter, '')
+        if digit and digit != previous:
+            code += digit
+        if letter not in 'HW':  # H and W don't separate letters with the same code
+            previous = digit
+    return (code + '000')[:4]
+
+
+def name_key(name):
+    tokens = name_tokens(name)
+    if not tokens:
+        return ''
+    # first and last word only, sorted so "Doe John" matches "John Doe"
+    return ':'.join(sorted({soundex(tokens[0]), soundex(tokens[-1])}))
+
+
+def match_keys(name, email, phone):
+    """The (kind, key) pairs a lead is indexed under."""
+    keys = {
+        ('email', normalize_email(email)),
+        ('phone', normalize_phone(phone)),
+        ('name', name_key(name)),
+    }
+    return {(kind, key) for kind, key in keys if key}
+
+
+def index_lead(lead):
+    """(Re)build the match keys of one lead, call after create or contact changes."""
+    LeadMatchKey.objects.filter(lead=lead).delete()
+    LeadMatchKey.objects.bulk_create([
+        LeadMatchKey(lead=lead, kind=kind, key=key)
+        for kind, key in match_keys(lead.name, lead.email, lead.phone)
+    ])
+
+
+def name_similarity(a, b):
+    return SequenceMatcher(None, ' '.join(sorted(name_tokens(a))), ' '.join(sorted(name_tokens(b)))).ratio()
+
+
+def score_pair(a, b):
+    """Fuzzy duplicate score between two leads, returns (score, reasons)."""
+    reasons = []
+    score = 0.0
+    if normalize_email(a.email) == normalize_email(b.email):
+        score += EMAIL_WEIGHT
+        reasons.append('email')
+    if a.phone and normalize_phone(a.phone) == normalize_phone(b.phone):
+        score += PHONE_WEIGHT
+        reasons.append('phone')
+    similarity = name_similarity(a.name, b.name)
+    score += NAME_WEIGHT * max(similarity - NAME_MIN_SIMILARITY, 0) / (1 - NAME_MIN_SIMILARITY)
+    if similarity >= STRONG_NAME_SIMILARITY:
+        reasons.append('name')
+
+        # partial contact evidence, only next to a near-identical name
+        local = email_local_part(a.email)
+        if 'email' not in reasons and local and local == email_local_part(b.email):
+            score += EMAIL_LOCAL_WEIGHT
+            reasons.append('email name')
+        phone_a, phone_b = normalize_phone(a.phone), normalize_phone(b.phone)
+        if 'phone' not in reasons and len(phone_a) >= 7 and phone_a[-7:] == phone_b[-7:]:
+            score += PHONE_LOCAL_WEIGHT
+            reasons.append('local phone')
+    return round(min(score, 1.0), 3), ', '.join(reasons)
+
+
+def _blocks(keys, exclude_ids=()):
+    """{(kind, key): [lead ids]} for active leads sharing any of `keys`."""
+    # key IN (...) uses lead_match_key_idx, kinds are checked here since the
+    # key formats (email / digits / soundex codes) practically never collide.
+    # ROW_NUMBER() per key, newest first, caps each block in SQL, so a huge
+    # block is never fetched only to be cut down here.
+    blocks = {}
+    rows = (
+        LeadMatchKey.objects.filter(key__in={key for _, key in keys}, lead__is_deleted=False)
+        .exclude(lead_id__in=exclude_ids)
+        .annotate(position=Window(RowNumber(), partition_by=[F('key'), F('kind')], order_by=F('lead_id').desc()))
+        .filter(position__lte=MAX_BLOCK_SIZE)
+        .order_by('key', 'kind', 'lead_id')
+        .values_list('kind', 'key', 'lead_id')
+    )
+    for kind, key, lead_id in rows:
+        if (kind, key) in keys:
+            blocks.setdefault((kind, key), []).append(lead_id)
+    return blocks
+
+
+def _save_pairs(pairs):
+    """Store flagged (lead, duplicate_of, score, reasons) pairs, keeping existing ones."""
+    DuplicateCandidate.objects.bulk_create(
+        [
+            DuplicateCandidate(lead_id=lead_id, duplicate_of_id=other_id, score=score, reasons=reasons)
+            for lead_id, other_id, score, reasons in pairs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def detect_duplicates(lead):
+    """
+    Find and store possible duplicates of one (already indexed) lead.
+    Returns the matching leads, best match first.
+    """
+    keys = match_keys(lead.name, lead.email, lead.phone)
+    if not keys:
+        return []
+
+    candidate_ids = {lead_id for ids in _blocks(keys, exclude_ids=[lead.pk]).values() for lead_id in ids}
+    candidates = Lead.objects.filter(pk__in=candidate_ids).only('id', 'name', 'email', 'phone')
+
+    matches = []
+    for candidate in candidates:
+        score, reasons = score_pair(lead, candidate)
+        if score >= DUPLICATE_THRESHOLD:
+            matches.append((score, reasons, candidate))
+    matches.sort(key=lambda match: (-match[0], match[2].pk))
+
+    # newer lead points at the older one it would be merged into
+    _save_pairs([
+        (max(lead.pk, candidate.pk), min(lead.pk, candidate.pk), score, reasons)
+        for score, reasons, candidate in matches
+    ])
+    return [candidate for _, _, candidate in matches]
+
+
+def scan_duplicates(chunk_size=CHUNK_SIZE):
+    """
+    Batch scan of all active leads, chunk by chunk in primary key order.
+
+    Leads without match keys (created before dedupe existed) are indexed
+    first. Each chunk then needs one query for the blocks and one for the
+    candidate leads. Returns the number of duplicate pairs flagged.
+    """
+    flagged = 0
+    last_id = 0
+
+    while True:
+        chunk = list(
+            Lead.objects.filter(is_deleted=False, pk__gt=last_id)
+            .order_by('pk').only('id', 'name', 'email', 'phone')[:chunk_size]
+        )
+        if not chunk:
+            return flagged
+        last_id = chunk[-1].pk
+
+        # Backfill the blocking index
+        indexed = set(
+            LeadMatchKey.objects.filter(lead_id__in=[lead.pk for lead in chunk])
+            .values_list('lead_id', flat=True).distinct()
+        )
+        LeadMatchKey.objects.bulk_create([
+            LeadMatchKey(lead=lead, kind=kind, key=key)
+            for lead in chunk if lead.pk not in indexed
+            for kind, key in match_keys(lead.name, lead.email, lead.phone)
+        ], ignore_conflicts=True)
+
+        keys_by_lead = {lead.pk: match_keys(lead.name, lead.email, lead.phone) for lead in chunk}
+        blocks = _blocks(set().union(*keys_by_lead.values()))
+
+        candidate_ids = {lead_id for ids in blocks.values() for lead_id in ids}
+        candidates = {lead.pk: lead for lead in Lead.objects.filter(pk__in=candidate_ids).only('id', 'name', 'email', 'phone')}
+
+        pairs = []
+        for lead in chunk:
+            # only compare with older leads so each pair is scored once
+            others = {
+                other_id
+                for key in keys_by_lead[lead.pk]
+                for other_id in blocks.get(key, ())
+                if other_id < lead.pk
+            }
+            for other_id in others:
+                score, reasons = score_pair(lead, candidates[other_id])
+                if score >= DUPLICATE_THRESHOLD:
+                    pairs.append((lead.pk, other_id, score, reasons))
+
+        _save_pairs(pairs)
+        flagged += len(pairs)
+
+
+def merge_leads(source, target, user=None):
+    """
+    Merge `source` into `target`: follow-ups, action logs, status history and
+    reminders move to the target, and the source is soft deleted.
+    """
+    with transaction.atomic():
+        FollowUp.objects.filter(lead=source).update(lead=target)
+        ActionLog.objects.filter(lead=source).update(lead=target)
+        StatusTransition.objects.filter(lead=source).update(lead=target)
+        Reminder.objects.filter(lead=source).update(lead=target)
+        LeadMatchKey.objects.filter(lead=source).delete()
+
+        DuplicateCandidate.objects.filter(
+            Q(lead=source) | Q(duplicate_of=source), status='pending'
+        ).update(status='merged')
+
+        was_open = is_open(source.status, source.is_deleted)
+        source.is_deleted = True
+        source.next_followup_at = None
+        source.save(update_fields=['is_deleted', 'next_followup_at', 'updated_at'])
+        if was_open:
+            adjust_load(source.assigned_to_id, -1)
+
+        ActionLog.objects.create(
+            user=user,
+            action='merge',
+            lead=target,
+            comment=f"Merged lead {source.name} (ID: {source.pk}) into {target.name} (ID: {target.pk})",
+        )
+
+        publish_lead_event('deleted', source)
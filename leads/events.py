@@ -0,0 +1,184 @@
+import asyncio
+import json
+import logging
+
+import redis
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.db import transaction
+
+from .fragments import bump_generation
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel the dashboard stream subscribes to
+LEAD_EVENTS_CHANNEL = 'crm:lead-events'
+
+# Events that change what the cached lead list rows show (see leads/fragments.py).
+# Follow-ups and reminders don't, and reminders come hundreds at a time.
+ROW_CHANGING_EVENTS = {'created', 'updated', 'deleted', 'batch_created', 'batch_assigned'}
+
+_client = None
+
+
+def get_events_client():
+    """
+    Lazily create one Redis client per process.
+    redis-py keeps a connection pool internally so it's safe to share.
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.LEAD_EVENTS_REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+    return _client
+
+
+def status_count_key(status):
+    # Matches the keys returned by the dashboard aggregate, e.g. 'new' -> 'new_leads'
+    return f"{status}_leads"
+
+
+def lead_payload(lead, latest_comment=None):
+    """Small JSON-safe snapshot of a lead for the recent leads table."""
+    return {
+        'id': lead.pk,
+        'name': lead.name,
+        'status': lead.status,
+        'status_display': lead.get_status_display(),
+        'assigned_to': lead.assigned_to_id,
+        'created_by': lead.created_by_id,
+        'latest_comment': latest_comment,
+    }
+
+
+def reminder_payload(reminder):
+    return {
+        'id': reminder.pk,
+        'user': reminder.user_id,
+        'due_at': reminder.due_at.isoformat(),
+    }
+
+
+def publish_lead_event(event_type, lead, deltas=None, latest_comment=None, reminder=None):
+    """
+    Publish a lead event to Redis once the current transaction commits.
+
+    event_type → 'created', 'updated', 'deleted', 'followup' or 'reminder'
+    deltas     → status-count changes, e.g. {'total_leads': 1, 'new_leads': 1}
+    reminder   → the Reminder that came due, for 'reminder' events
+
+    Publishing is best effort: if Redis is down the write still succeeds
+    and connected dashboards simply miss this update.
+    """
+    event = {
+        'type': event_type,
+        'lead': lead_payload(lead, latest_comment),
+        'deltas': deltas or {},
+    }
+    if reminder is not None:
+        event['reminder'] = reminder_payload(reminder)
+    _publish_on_commit(event_type, event)
+
+
+def publish_batch_event(deltas, created_by=None):
+    """One event for a whole batch of new leads: counts only, no table rows."""
+    _publish_on_commit('batch_created', {
+        'type': 'batch_created',
+        'lead': None,
+        # batches are inserted unassigned, who sees them is decided like for one lead
+        'assigned_to': None,
+        'created_by': created_by,
+        'deltas': deltas,
+    })
+
+
+def publish_assignment_event(groups):
+    """
+    One event for a run of backlog assignment (see assignment.assign_backlog).
+
+    groups → {(assigned_to, created_by, status): number of leads}. The stream
+    turns them into the counts each viewer loses (see scoping.assignment_deltas).
+    """
+    _publish_on_commit('batch_assigned', {
+        'type': 'batch_assigned',
+        'lead': None,
+        'groups': [[assigned_to, created_by, status, count] for (assigned_to, created_by, status), count in groups.items()],
+        'deltas': {},
+    })
+
+
+def _publish_on_commit(event_type, event):
+    message = json.dumps(event)
+
+    def _publish():
+        try:
+            get_events_client().publish(LEAD_EVENTS_CHANNEL, message)
+        except redis.RedisError:
+            logger.warning("Could not publish lead event '%s'", event_type)
+
+    # Batches are one event, so one bump however many leads they touch
+    if event_type in ROW_CHANGING_EVENTS:
+        transaction.on_commit(bump_generation)
+    # Don't push state to browsers that could still be rolled back
+    transaction.on_commit(_publish)
+
+
+class LeadEventHub:
+    """
+    One Redis subscription per process, fanned out to every open dashboard
+    stream, so viewers don't each hold a Redis connection.
+
+    Each stream gets a bounded queue of (event dict, raw JSON). A stream that
+    falls more than STREAM_QUEUE_SIZE events behind misses events instead of
+    growing memory. The reader starts with the first stream, stops with the
+    last one and reconnects after Redis errors.
+    """
+    STREAM_QUEUE_SIZE = 100
+    RECONNECT_DELAY = 2  # seconds
+
+    def __init__(self):
+        self._queues = set()
+        self._reader = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=self.STREAM_QUEUE_SIZE)
+        self._queues.add(queue)
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.get_running_loop().create_task(self._read())
+        return queue
+
+    def unsubscribe(self, queue):
+        self._queues.discard(queue)
+        if not self._queues and self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+
+    def dispatch(self, raw):
+        event = json.loads(raw)
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait((event, raw))
+            except asyncio.QueueFull:
+                pass  # slow client, it misses this update
+
+    async def _read(self):
+        while True:
+            client = aioredis.from_url(settings.LEAD_EVENTS_REDIS_URL)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(LEAD_EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message['type'] == 'message':
+                        self.dispatch(message['data'].decode())
+            except redis.RedisError:
+                logger.warning("Lead event subscription lost, reconnecting")
+            finally:
+                await pubsub.aclose()
+                await client.aclose()
+            await asyncio.sleep(self.RECONNECT_DELAY)
+
+
+event_hub = LeadEventHub()
@@ -0,0 +1,25 @@
+"""
+Cache generation for rendered lead fragments.
+
+A single counter, bumped after every committed lead write. The template
+fragment caches in lead_list.html put it in their key, so one write makes
+every cached row table and pagination block stale at once, with no need
+to find and delete keys. Stale fragments simply expire.
+"""
+from django.core.cache import cache
+
+GENERATION_KEY = 'leads:fragment_generation'
+
+
+def get_generation():
+    # add() only sets the key if it's missing, so it never resets a live counter
+    cache.add(GENERATION_KEY, 1, timeout=None)
+    return cache.get(GENERATION_KEY, 1)
+
+
+def bump_generation():
+    cache.add(GENERATION_KEY, 1, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass  # evicted in between, the next get_generation() starts over
@@ -0,0 +1,51 @@
+"""
+Response compression for API payloads.
+
+Brotli is used when the client accepts it and the brotli package is
+installed, gzip otherwise. Only the content types in
+settings.LEAD_COMPRESS_CONTENT_TYPES are compressed: HTML pages carry CSRF
+tokens (compressing them opens the BREACH attack) and the dashboard
+event stream must not be buffered.
+"""
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency, falls back to gzip
+    brotli = None
+
+MIN_SIZE = 200  # smaller bodies don't shrink enough to be worth it
+
+
+class CompressionMiddleware(GZipMiddleware):
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if content_type not in settings.LEAD_COMPRESS_CONTENT_TYPES:
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (
+            brotli is None
+            or 'br' not in accept_encoding
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < MIN_SIZE
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)  # fast enough per request
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = 'br'
+        # weak ETag, same as GZipMiddleware does
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
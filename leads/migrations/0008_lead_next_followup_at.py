@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0007_assignmentprofile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='next_followup_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='actionlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('followup', 'Follow-Up'), ('reminder', 'Reminder')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(condition=models.Q(('next_followup_at__isnull', False)), fields=['next_followup_at'], name='lead_next_followup_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0009_status_transitions_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='actionlog',
+            name='action',
+            field=models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('followup', 'Follow-Up'), ('reminder', 'Reminder'), ('merge', 'Merge')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('reasons', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('merged', 'Merged'), ('dismissed', 'Dismissed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('duplicate_of', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='leads.lead')),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='leads.lead')),
+            ],
+            options={
+                'ordering': ['-score', '-id'],
+                'constraints': [models.UniqueConstraint(fields=('lead', 'duplicate_of'), name='duplicate_candidate_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeadMatchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('email', 'Email'), ('phone', 'Phone'), ('name', 'Name')], max_length=10)),
+                ('key', models.CharField(max_length=255)),
+                ('lead', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='match_keys', to='leads.lead')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['key', 'kind'], name='lead_match_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('lead', 'kind', 'key'), name='lead_match_key_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-19 05:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0010_dedupe'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='lead',
+            options={'permissions': [('view_all_leads', 'Can view all leads')]},
+        ),
+    ]
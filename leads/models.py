@@ -13,9 +13,30 @@ class Lead(models.Model):
     phone = models.CharField(max_length=20, blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='new')
     assigned_to = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    # Creator keeps seeing the lead after it's assigned to someone else (see leads/scoping.py)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)  # Soft delete flag
+    score = models.FloatField(default=0)  # Priority score, recomputed in batch by leads/scoring.py
+    next_followup_at = models.DateTimeField(null=True, blank=True)  # When to remind the assignee (see leads/reminders.py)
+    status_changed_at = models.DateTimeField(null=True, blank=True)  # Last status transition, for time-in-status
+
+    class Meta:
+        permissions = [
+            # without it users only see their own / their team's leads (see leads/scoping.py)
+            ('view_all_leads', 'Can view all leads'),
+        ]
+        indexes = [
+            # lead_list is ordered by priority, newest first for equal scores
+            models.Index(fields=['-score', '-id'], name='lead_score_idx'),
+            # Partial index: only leads with a pending reminder, so the due scan stays small
+            models.Index(
+                fields=['next_followup_at'],
+                name='lead_next_followup_idx',
+                condition=models.Q(next_followup_at__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -41,6 +62,8 @@ class ActionLog(models.Model):
         ('update', 'Update'),
         ('delete', 'Delete'),
         ('followup', 'Follow-Up'),
+        ('reminder', 'Reminder'),
+        ('merge', 'Merge'),
     )
 
     # Who performed the action
@@ -55,4 +78,131 @@ class ActionLog(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.timestamp} - {self.user} - {self.action}"
\ No newline at end of file
+        return f"{self.timestamp} - {self.user} - {self.action}"
+
+
+# Per-user settings for automatic lead assignment (see leads/assignment.py)
+class AssignmentProfile(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='assignment_profile')
+    # relative share of new leads, a user with capacity 2 gets twice as many as capacity 1
+    capacity = models.PositiveIntegerField(default=1)
+    # switch off to stop receiving new leads (holidays, leaving the team...)
+    accepts_leads = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.user} (capacity {self.capacity})"
+
+
+# Structured status change events, the source for analytics rollups
+class StatusTransition(models.Model):
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='transitions')
+    # who changed the status
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    from_status = models.CharField(max_length=20, blank=True)  # empty when the lead was created
+    to_status = models.CharField(max_length=20)
+    # how long the lead sat in from_status, empty on creation
+    seconds_in_from_status = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.lead_id}: {self.from_status or '-'} -> {self.to_status}"
+
+
+# Daily pre-aggregated transitions, maintained incrementally by leads/analytics.py
+class DailyStatusRollup(models.Model):
+    day = models.DateField()
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20)
+    transitions = models.PositiveIntegerField(default=0)
+    total_seconds_in_from_status = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'user', 'from_status', 'to_status'], name='daily_status_rollup_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_status_rollup_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.user}: {self.from_status or '-'} -> {self.to_status} ({self.transitions})"
+
+
+# How far each rollup job has read its source table
+class RollupWatermark(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.last_id}"
+
+
+# Blocking index for duplicate detection (see leads/dedupe.py): a few normalized
+# keys per lead, so candidates are found with indexed lookups instead of comparing all pairs
+class LeadMatchKey(models.Model):
+    KIND_CHOICES = (
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+        ('name', 'Name'),
+    )
+
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='match_keys')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    key = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['lead', 'kind', 'key'], name='lead_match_key_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['key', 'kind'], name='lead_match_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead_id} {self.kind}: {self.key}"
+
+
+# Possible duplicate pair found by leads/dedupe.py, waiting for a merge or dismiss
+class DuplicateCandidate(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('merged', 'Merged'),
+        ('dismissed', 'Dismissed'),
+    )
+
+    # the newer lead, merged into duplicate_of
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='duplicate_candidates')
+    duplicate_of = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    reasons = models.CharField(max_length=100)  # e.g. "email, name"
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-score', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['lead', 'duplicate_of'], name='duplicate_candidate_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.lead_id} ~ {self.duplicate_of_id} ({self.score})"
+
+
+# A follow-up that came due (see leads/reminders.py), shown on the dashboard until dismissed
+class Reminder(models.Model):
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='reminders')
+    # who should follow up: the assignee when it came due, empty for unassigned leads
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='reminders')
+    due_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    dismissed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['due_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'due_at'], name='reminder_open_idx', condition=models.Q(dismissed_at__isnull=True)),
+        ]
+
+    def __str__(self):
+        return f"{self.lead_id} due {self.due_at}"
@@ -0,0 +1,71 @@
+"""
+Scheduled follow-up reminders.
+
+Lead.next_followup_at holds when the assignee should contact the lead next.
+The send_due_reminders Celery task (run by beat every minute) claims due
+leads in batches with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+workers can process reminders in parallel without picking the same lead twice.
+
+A claimed lead gets a Reminder row (keeping the due time) that the
+dashboard lists for the assignee until dismissed, and a 'reminder' event
+that pushes it to open dashboards.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_lead_event
+from .models import ActionLog, Lead, Reminder
+
+BATCH_SIZE = 500
+MAX_BATCHES = 200  # per task run, the next beat tick picks up the rest
+
+
+def claim_due_batch(now, batch_size=BATCH_SIZE):
+    """
+    Claim and process one batch of due reminders in a single transaction.
+
+    Rows locked by another worker are skipped rather than waited on, and
+    next_followup_at is cleared before commit (the Reminder keeps the due
+    time), so a lead is reminded once. Returns the number of reminders processed.
+    """
+    with transaction.atomic():
+        due = list(
+            Lead.objects.select_for_update(skip_locked=True)
+            .filter(next_followup_at__lte=now, is_deleted=False)
+            .order_by('next_followup_at')[:batch_size]
+        )
+        if not due:
+            return 0
+
+        reminders = Reminder.objects.bulk_create([
+            Reminder(lead=lead, user_id=lead.assigned_to_id, due_at=lead.next_followup_at)
+            for lead in due
+        ])
+        # system action, nobody performed it
+        ActionLog.objects.bulk_create([
+            ActionLog(
+                user=None,
+                action='reminder',
+                lead=lead,
+                comment=f"Follow-up due at {lead.next_followup_at:%Y-%m-%d %H:%M}",
+            )
+            for lead in due
+        ])
+        Lead.objects.filter(pk__in=[lead.pk for lead in due]).update(next_followup_at=None)
+
+        for lead, reminder in zip(due, reminders):
+            publish_lead_event('reminder', lead, reminder=reminder)
+
+    return len(due)
+
+
+def process_due_reminders(batch_size=BATCH_SIZE, max_batches=MAX_BATCHES):
+    """Process due reminders batch by batch. Returns the number processed."""
+    now = timezone.now()
+    processed = 0
+    for _ in range(max_batches):
+        claimed = claim_due_batch(now, batch_size)
+        processed += claimed
+        if claimed < batch_size:
+            break
+    return processed
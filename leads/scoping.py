@@ -0,0 +1,111 @@
+"""
+Row-level lead visibility.
+
+Superusers and users with the leads.view_all_leads permission see every
+lead. Everybody else sees the leads assigned to or created by themselves
+or members of their groups (a Django Group is a team), plus unassigned
+leads, which are a shared pool until someone owns them.
+
+A scope is computed once per session (refreshed every SCOPE_SESSION_TTL
+seconds) and memoized on the request, together with the user's lead
+permissions, so views don't re-query groups and permissions. Its `key`
+is shared by everyone with the same visibility ('all', 'team-1-4',
+'user-7'), which is what the list/dashboard caches are partitioned by.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from .events import status_count_key
+
+SCOPE_SESSION_KEY = '_lead_scope'
+
+
+def build_scope(user):
+    """Visibility and lead permissions for one user, JSON-safe for the session."""
+    # superusers get every permission here, so one check covers both cases
+    perms = sorted(perm for perm in user.get_all_permissions() if perm.startswith('leads.'))
+
+    if 'leads.view_all_leads' in perms:
+        key, user_ids = 'all', None
+    else:
+        group_ids = sorted(user.groups.values_list('id', flat=True))
+        if group_ids:
+            key = 'team-' + '-'.join(str(group_id) for group_id in group_ids)
+            members = User.objects.filter(groups__in=group_ids).values_list('id', flat=True).distinct()
+            user_ids = sorted(set(members) | {user.pk})
+        else:
+            key, user_ids = f'user-{user.pk}', [user.pk]
+
+    return {
+        'user_id': user.pk,
+        'key': key,
+        'user_ids': user_ids,
+        'perms': perms,
+        'expires': time.time() + settings.LEAD_SCOPE_SESSION_TTL,
+    }
+
+
+def get_scope(request):
+    """The request user's scope: memoized on the request, cached in the session."""
+    scope = getattr(request, '_lead_scope', None)
+    if scope is not None:
+        return scope
+
+    session = getattr(request, 'session', None)
+    scope = session.get(SCOPE_SESSION_KEY) if session is not None else None
+    if not scope or scope['user_id'] != request.user.pk or scope['expires'] < time.time():
+        scope = build_scope(request.user)
+        # only browser sessions, don't create a session for token/API clients
+        if session is not None and session.session_key:
+            session[SCOPE_SESSION_KEY] = scope
+
+    request._lead_scope = scope
+    return scope
+
+
+def has_lead_perm(request, perm):
+    """Memoized replacement for request.user.has_perm('leads.…')."""
+    return request.user.is_active and perm in get_scope(request)['perms']
+
+
+def scope_leads(queryset, scope):
+    """Restrict a Lead queryset to what the scope can see."""
+    if scope['user_ids'] is None:
+        return queryset
+    return queryset.filter(
+        Q(assigned_to_id__in=scope['user_ids'])
+        | Q(assigned_to__isnull=True)
+        | Q(created_by_id__in=scope['user_ids'])
+    )
+
+
+def event_visible(event, scope):
+    """Whether a lead event (see leads/events.py) is about a lead the scope can see, same rule as scope_leads."""
+    if scope['user_ids'] is None:
+        return True
+    # batch events carry no lead, their owner fields are on the event itself
+    owners = event['lead'] or event
+    return (
+        owners['assigned_to'] is None
+        or owners['assigned_to'] in scope['user_ids']
+        or owners['created_by'] in scope['user_ids']
+    )
+
+
+def assignment_deltas(event, scope):
+    """
+    Count changes a scope sees from a 'batch_assigned' event: pool leads that
+    now belong to users outside it drop out of its counts.
+    """
+    deltas = {}
+    if scope['user_ids'] is None:
+        return deltas
+    for assigned_to, created_by, status, count in event['groups']:
+        if assigned_to in scope['user_ids'] or created_by in scope['user_ids']:
+            continue
+        for key in ('total_leads', status_count_key(status)):
+            deltas[key] = deltas.get(key, 0) - count
+    return deltas
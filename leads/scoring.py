@@ -0,0 +1,178 @@
+"""
+Lead priority scoring.
+
+Scores are computed in batch (see recompute_scores / the recompute_lead_scores
+Celery task) with NumPy over columnar extracts of the leads table, instead of
+a Python loop per lead. A higher score means the lead should be worked sooner.
+"""
+import numpy as np
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .fragments import bump_generation
+from .models import ActionLog, FollowUp, Lead
+
+# How much each status is worth chasing. Closed leads drop to the bottom.
+STATUS_WEIGHTS = {
+    'new': 0.6,
+    'in_progress': 1.0,
+    'converted': 0.0,
+    'lost': 0.0,
+}
+
+# Share of each signal in the final score (sums to 1)
+FRESHNESS_WEIGHT = 0.35   # recently created leads are hotter
+STALENESS_WEIGHT = 0.35   # leads nobody contacted for a while need attention
+ENGAGEMENT_WEIGHT = 0.15  # number of follow-ups
+ACTIVITY_WEIGHT = 0.15    # number of ActionLog entries
+
+FRESHNESS_DAYS = 30       # freshness decay constant
+STALENESS_DAYS = 7        # a week without contact is already quite stale
+SATURATION_COUNT = 10     # counts above this don't add more
+
+CHUNK_SIZE = 5000
+# Freshness and staleness move a little with every run; smaller changes than
+# this aren't written, or each run would rewrite most of the table
+SCORE_TOLERANCE = 0.5
+SECONDS_PER_DAY = 86400.0
+
+
+def compute_scores(statuses, age_days, since_contact_days, followup_counts, action_counts):
+    """
+    Vectorized score for a batch of leads. All arguments are 1-D arrays of
+    the same length, returns a float array of scores between 0 and 100.
+    """
+    # Map status strings to weights by looking up each distinct value once
+    unique_statuses, inverse = np.unique(np.asarray(statuses), return_inverse=True)
+    status_weight = np.array([STATUS_WEIGHTS.get(s, 0.0) for s in unique_statuses])[inverse]
+
+    freshness = np.exp(-np.maximum(age_days, 0) / FRESHNESS_DAYS)
+    staleness = 1 - np.exp(-np.maximum(since_contact_days, 0) / STALENESS_DAYS)
+    saturation = np.log1p(SATURATION_COUNT)
+    engagement = np.minimum(np.log1p(followup_counts) / saturation, 1)
+    activity = np.minimum(np.log1p(action_counts) / saturation, 1)
+
+    score = status_weight * (
+        FRESHNESS_WEIGHT * freshness
+        + STALENESS_WEIGHT * staleness
+        + ENGAGEMENT_WEIGHT * engagement
+        + ACTIVITY_WEIGHT * activity
+    )
+    return np.round(score * 100, 2)
+
+
+def _timestamps(values):
+    return np.fromiter((v.timestamp() for v in values), dtype=np.float64, count=len(values))
+
+
+def _align(ids, lead_ids):
+    """
+    Positions of `lead_ids` inside the sorted `ids` array. Rows of soft-deleted
+    leads fall inside the id range but aren't in `ids`, so they are masked out.
+    """
+    lead_ids = np.asarray(lead_ids)
+    positions = np.searchsorted(ids, lead_ids).clip(0, len(ids) - 1)
+    found = ids[positions] == lead_ids
+    return positions[found], found
+
+
+def score_chunk(ids, statuses, created_ts, now_ts):
+    """Score one chunk of leads, pulling follow-up/action stats for its id range."""
+    lo, hi = int(ids[0]), int(ids[-1])
+    followup_counts = np.zeros(len(ids))
+    action_counts = np.zeros(len(ids))
+    # Never contacted → count staleness from creation
+    last_contact_ts = created_ts.copy()
+
+    # order_by() clears FollowUp's default ordering so it doesn't leak into GROUP BY
+    followups = list(
+        FollowUp.objects.filter(lead_id__gte=lo, lead_id__lte=hi)
+        .order_by().values('lead_id')
+        .annotate(n=Count('id'), last=Max('created_at'))
+        .values_list('lead_id', 'n', 'last')
+    )
+    if followups:
+        lead_ids, counts, last = zip(*followups)
+        positions, found = _align(ids, lead_ids)
+        followup_counts[positions] = np.asarray(counts)[found]
+        last_contact_ts[positions] = _timestamps(last)[found]
+
+    actions = list(
+        ActionLog.objects.filter(lead_id__gte=lo, lead_id__lte=hi)
+        .order_by().values('lead_id')
+        .annotate(n=Count('id'))
+        .values_list('lead_id', 'n')
+    )
+    if actions:
+        lead_ids, counts = zip(*actions)
+        positions, found = _align(ids, lead_ids)
+        action_counts[positions] = np.asarray(counts)[found]
+
+    return compute_scores(
+        statuses,
+        age_days=(now_ts - created_ts) / SECONDS_PER_DAY,
+        since_contact_days=(now_ts - last_contact_ts) / SECONDS_PER_DAY,
+        followup_counts=followup_counts,
+        action_counts=action_counts,
+    )
+
+
+def score_leads(leads):
+    """
+    Score just-created leads right away, so they don't sort below every
+    scored lead (at the default 0) until the next recompute_scores run.
+    """
+    leads = sorted(leads, key=lambda lead: lead.pk)
+    if not leads:
+        return
+    ids = np.fromiter((lead.pk for lead in leads), dtype=np.int64, count=len(leads))
+    scores = score_chunk(
+        ids,
+        np.asarray([lead.status for lead in leads]),
+        _timestamps([lead.created_at for lead in leads]),
+        timezone.now().timestamp(),
+    )
+    for lead, score in zip(leads, scores):
+        lead.score = float(score)
+    Lead.objects.bulk_update(leads, ['score'], batch_size=1000)
+
+
+def recompute_scores(chunk_size=CHUNK_SIZE):
+    """
+    Recompute Lead.score for every active lead.
+
+    Walks the table in primary key order (keyset pagination, no OFFSET),
+    scores each chunk with NumPy and bulk-updates only the scores that
+    moved by at least SCORE_TOLERANCE. Returns the number of leads updated.
+    """
+    now_ts = timezone.now().timestamp()
+    last_id = 0
+    updated = 0
+
+    while True:
+        rows = list(
+            Lead.objects.filter(is_deleted=False, pk__gt=last_id)
+            .order_by('pk')
+            .values_list('id', 'status', 'created_at', 'score')[:chunk_size]
+        )
+        if not rows:
+            break
+
+        ids, statuses, created_at, old_scores = zip(*rows)
+        ids = np.asarray(ids)
+        scores = score_chunk(ids, np.asarray(statuses), _timestamps(created_at), now_ts)
+
+        changed = np.flatnonzero(np.abs(scores - np.asarray(old_scores, dtype=np.float64)) >= SCORE_TOLERANCE)
+        if len(changed):
+            Lead.objects.bulk_update(
+                [Lead(pk=int(ids[i]), score=float(scores[i])) for i in changed],
+                ['score'],
+                batch_size=1000,
+            )
+            updated += len(changed)
+
+        last_id = int(ids[-1])
+
+    if updated:
+        bump_generation()  # list order changed
+    return updated
@@ -1,9 +1,72 @@
+from django.conf import settings
 from rest_framework import serializers
-from leads.models import Lead
+from leads.models import FollowUp, Lead
 
 class LeadSerializer(serializers.ModelSerializer):
     latest_comment = serializers.CharField(read_only=True)
 
     class Meta:
         model = Lead
-        fields = ['id', 'name', 'email', 'phone', 'latest_comment']
\ No newline at end of file
+        fields = ['id', 'name', 'email', 'phone', 'latest_comment']
+
+
+class LeadBatchSerializer(serializers.ListSerializer):
+    """Checks email uniqueness for a whole batch with one query instead of one per row."""
+
+    def validate(self, attrs):
+        emails = [row['email'] for row in attrs]
+        seen, repeated = set(), set()
+        for email in emails:
+            (repeated if email in seen else seen).add(email)
+        if repeated:
+            raise serializers.ValidationError(f"Emails repeated in the batch: {', '.join(sorted(repeated))}")
+
+        existing = sorted(Lead.objects.filter(email__in=emails).values_list('email', flat=True))
+        if existing:
+            raise serializers.ValidationError(f"Leads with these emails already exist: {', '.join(existing)}")
+        return attrs
+
+
+class LeadWriteSerializer(serializers.ModelSerializer):
+    """Create / batch-create / patch payloads, same rules as the HTML forms."""
+
+    class Meta:
+        model = Lead
+        fields = ['id', 'name', 'email', 'phone', 'status', 'next_followup_at']
+        read_only_fields = ['id']
+        list_serializer_class = LeadBatchSerializer
+        extra_kwargs = {
+            'phone': {'required': True, 'allow_null': False, 'allow_blank': False},
+            # uniqueness is checked in validate_email / LeadBatchSerializer
+            'email': {'validators': []},
+        }
+
+    def validate_phone(self, phone):
+        if not phone.isdigit() or len(phone) != 10:
+            raise serializers.ValidationError("Phone number must be 10 digits.")
+        return phone
+
+    def validate_email(self, email):
+        if isinstance(self.parent, serializers.ListSerializer):
+            return email  # the batch checks all emails at once
+        existing = Lead.objects.filter(email=email)
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError("A lead with this email already exists.")
+        return email
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        kwargs.setdefault('max_length', settings.LEAD_API_BATCH_LIMIT)
+        kwargs.setdefault('allow_empty', False)
+        return super().many_init(*args, **kwargs)
+
+
+class FollowUpSerializer(serializers.ModelSerializer):
+    user = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = FollowUp
+        fields = ['id', 'user', 'comment', 'created_at']
+        read_only_fields = ['id', 'user', 'created_at']
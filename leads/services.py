@@ -0,0 +1,229 @@
+"""
+Lead write operations shared by the HTML views and the REST API.
+
+Each function performs the write and all of its side effects (audit log,
+status history, duplicate index, assignment, live dashboard events), so a
+lead created or edited through the API behaves exactly like one from the forms.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .analytics import record_transition
+from .assignment import adjust_load, assign_lead, is_open
+from .dedupe import detect_duplicates, index_lead, match_keys
+from .events import publish_batch_event, publish_lead_event, status_count_key
+from .models import ActionLog, FollowUp, Lead, LeadMatchKey, StatusTransition
+from .scoring import score_leads
+
+# Lead fields an update may change, with their label in the audit log
+UPDATABLE_FIELDS = {
+    'name': 'name',
+    'email': 'email',
+    'phone': 'phone',
+    'status': 'status',
+    'next_followup_at': 'next follow-up',
+}
+CONTACT_FIELDS = ('name', 'email', 'phone')
+
+
+class DuplicateEmailError(Exception):
+    """
+    Leads with these emails were inserted by a concurrent request after
+    validation checked them; the unique constraint caught it on insert.
+    """
+
+    def __init__(self, emails):
+        super().__init__(f"Leads with these emails already exist: {', '.join(emails)}")
+        self.emails = emails
+
+
+def _raise_taken_emails(emails, error):
+    taken = sorted(Lead.objects.filter(email__in=emails).values_list('email', flat=True))
+    if not taken:
+        raise error  # some other constraint, not the race on email
+    raise DuplicateEmailError(taken) from error
+
+
+def create_lead(user, name, email, phone, status='new', next_followup_at=None):
+    """
+    Create one lead. Returns (lead, possible duplicates).
+    Raises DuplicateEmailError if the email was taken since it was validated.
+
+    One transaction: if a side effect fails, no lead is left behind without
+    its history, audit row or dedupe index.
+    """
+    with transaction.atomic():
+        try:
+            # savepoint, so a failed insert doesn't break a surrounding transaction
+            with transaction.atomic():
+                lead = Lead.objects.create(
+                    name=name, email=email, phone=phone, status=status, next_followup_at=next_followup_at,
+                    created_by=user,
+                )
+        except IntegrityError as error:
+            _raise_taken_emails([email], error)
+
+        record_transition(lead, '', lead.status, user)
+
+        # Fuzzy duplicate check (same person, different email/phone format)
+        index_lead(lead)
+        duplicates = detect_duplicates(lead)
+
+        # Hand the new lead to a staff user (see leads/assignment.py)
+        if settings.LEAD_AUTO_ASSIGN:
+            assign_lead(lead)
+
+        # Action Log for create action
+        ActionLog.objects.create(
+            user=user,
+            action='create',
+            lead=lead,
+            comment=f"Lead created with name: {name}, email: {email}, phone: {phone}"
+        )
+
+        # Score now so it sorts into place in the list (see leads/scoring.py)
+        score_leads([lead])
+
+        # Push to open dashboards
+        publish_lead_event('created', lead, deltas={
+            'total_leads': 1,
+            status_count_key(lead.status): 1,
+        })
+    return lead, duplicates
+
+
+def create_leads_bulk(user, rows):
+    """
+    Create many leads in one transaction with a handful of bulk INSERTs,
+    whatever the number of rows. `rows` are dicts of name/email/phone/status/next_followup_at.
+
+    Duplicate detection is left to the batch scan, and assignment to the
+    assign_unassigned_leads task queued after commit. Raises
+    DuplicateEmailError, with nothing created, if any email was taken since
+    the batch was validated.
+    """
+    # imported here, leads.tasks imports the modules this one builds on
+    from .tasks import assign_unassigned_leads
+
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            leads = Lead.objects.bulk_create([
+                Lead(
+                    name=row['name'],
+                    email=row['email'],
+                    phone=row.get('phone'),
+                    status=row.get('status', 'new'),
+                    next_followup_at=row.get('next_followup_at'),
+                    status_changed_at=now,
+                    created_by=user,
+                )
+                for row in rows
+            ])
+            StatusTransition.objects.bulk_create([
+                StatusTransition(lead=lead, user=user, from_status='', to_status=lead.status)
+                for lead in leads
+            ])
+            ActionLog.objects.bulk_create([
+                ActionLog(
+                    user=user,
+                    action='create',
+                    lead=lead,
+                    comment=f"Lead created with name: {lead.name}, email: {lead.email}, phone: {lead.phone}",
+                )
+                for lead in leads
+            ])
+            score_leads(leads)
+            LeadMatchKey.objects.bulk_create([
+                LeadMatchKey(lead=lead, kind=kind, key=key)
+                for lead in leads
+                for kind, key in match_keys(lead.name, lead.email, lead.phone)
+            ])
+
+            deltas = {'total_leads': len(leads)}
+            for lead in leads:
+                key = status_count_key(lead.status)
+                deltas[key] = deltas.get(key, 0) + 1
+            publish_batch_event(deltas, created_by=user.pk)
+
+            if settings.LEAD_AUTO_ASSIGN:
+                transaction.on_commit(assign_unassigned_leads.delay)
+    except IntegrityError as error:
+        _raise_taken_emails([row['email'] for row in rows], error)
+
+    return leads
+
+
+def update_lead(lead, user, changes):
+    """
+    Apply field changes ({field: new value}, see UPDATABLE_FIELDS) to a lead.
+    Returns the audit descriptions of what changed, empty if nothing did.
+    Raises DuplicateEmailError if a new email was taken since it was validated.
+    """
+    changed_fields = []
+    for field, label in UPDATABLE_FIELDS.items():
+        if field in changes and changes[field] != getattr(lead, field):
+            changed_fields.append(f"{label}: {getattr(lead, field)} -> {changes[field]}")
+    if not changed_fields:
+        return []
+
+    old_status = lead.status
+    contact_changed = any(field in changes and changes[field] != getattr(lead, field) for field in CONTACT_FIELDS)
+    for field in UPDATABLE_FIELDS:
+        if field in changes:
+            setattr(lead, field, changes[field])
+
+    with transaction.atomic():
+        try:
+            # savepoint, same email race as create_lead
+            with transaction.atomic():
+                lead.save()
+        except IntegrityError as error:
+            _raise_taken_emails([lead.email], error)
+
+        if contact_changed:
+            index_lead(lead)
+            detect_duplicates(lead)
+
+        if lead.status != old_status:
+            record_transition(lead, old_status, lead.status, user)
+
+        # Keep the assignee's open-lead counter in step with the new status
+        if is_open(old_status) != is_open(lead.status):
+            adjust_load(lead.assigned_to_id, 1 if is_open(lead.status) else -1)
+
+        # Audit Log for update action
+        ActionLog.objects.create(
+            user=user,
+            action='update',
+            lead=lead,
+            comment=f"Updated fields: {', '.join(changed_fields)}"
+        )
+
+        # Push to open dashboards, moving one count between status cards
+        deltas = {}
+        if lead.status != old_status:
+            deltas = {status_count_key(old_status): -1, status_count_key(lead.status): 1}
+        publish_lead_event('updated', lead, deltas=deltas)
+    return changed_fields
+
+
+def add_followup(lead, user, comment):
+    """Record a follow-up comment on a lead."""
+    followup = FollowUp.objects.create(
+        lead=lead,
+        user=user,
+        comment=comment
+    )
+
+    # Audit Log for follow-up action
+    ActionLog.objects.create(
+        user=user,
+        action='followup',
+        lead=lead,
+        comment=comment
+    )
+
+    publish_lead_event('followup', lead, latest_comment=comment)
+    return followup
@@ -1,6 +1,56 @@
+from importlib import import_module
+
 from celery import shared_task
+from django.conf import settings
+from .scoring import recompute_scores
+from .assignment import assign_backlog, rebuild_loads
+from .reminders import process_due_reminders
+from .analytics import update_rollups
+from .dedupe import scan_duplicates
 
-@shared_task
+@shared_task(ignore_result=False)
 def test_task():
     print("Test Task Executed------------------!")
     return "Task Completed"
+
+
+@shared_task(single_instance=True)
+def recompute_lead_scores():
+    """Batch recompute of Lead.score (see leads/scoring.py)."""
+    return recompute_scores()
+
+
+@shared_task(single_instance=True)
+def assign_unassigned_leads():
+    """Assign the backlog of unassigned open leads (see leads/assignment.py)."""
+    return assign_backlog()
+
+
+@shared_task(single_instance=True)
+def rebuild_assignment_loads():
+    """Re-seed the per-user open-lead counters from the database."""
+    return len(rebuild_loads())
+
+
+@shared_task
+def send_due_reminders():
+    """Claim and log due follow-up reminders (see leads/reminders.py)."""
+    return process_due_reminders()
+
+
+@shared_task(single_instance=True)
+def update_analytics_rollups():
+    """Fold new status transitions into the daily rollups (see leads/analytics.py)."""
+    return update_rollups()
+
+
+@shared_task(single_instance=True)
+def scan_for_duplicates():
+    """Batch duplicate scan over all active leads (see leads/dedupe.py)."""
+    return scan_duplicates()
+
+
+@shared_task(single_instance=True)
+def clear_expired_sessions():
+    """Delete expired sessions (the cache backend expires its own, this is for the table)."""
+    import_module(settings.SESSION_ENGINE).SessionStore.clear_expired()
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from leads.models import DailyStatusRollup, Lead, StatusTransition
+from leads.analytics import record_transition, update_rollups
+
+class AnalyticsRollupTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="staff", password="pass", is_staff=True)
+        self.leads = [Lead.objects.create(name=f"L{i}", email=f"l{i}@example.com") for i in range(4)]
+        for lead in self.leads:
+            record_transition(lead, '', 'new', self.user)
+        record_transition(self.leads[0], 'new', 'converted', self.user)
+        record_transition(self.leads[1], 'new', 'lost', self.user)
+        # rollups skip very recent rows, pretend these happened earlier today
+        StatusTransition.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+
+    def test_rollups_are_incremental(self):
+        """Each transition is counted exactly once across runs"""
+        self.assertEqual(update_rollups(batch_size=4), 6)
+        self.assertEqual(update_rollups(), 0)
+
+        rollup = DailyStatusRollup.objects.get(from_status='', to_status='new')
+        self.assertEqual(rollup.transitions, 4)
+
+        record_transition(self.leads[2], 'new', 'converted', self.user)
+        StatusTransition.objects.filter(to_status='converted').update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(update_rollups(), 1)
+        self.assertEqual(DailyStatusRollup.objects.get(to_status='converted').transitions, 2)
+
+    def test_funnel_api(self):
+        """Analytics API reports conversion rate and per-rep throughput from rollups"""
+        update_rollups()
+        client = Client()
+        client.login(username="staff", password="pass")
+
+        response = client.get(reverse('api_funnel_analytics'))
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['created'], 4)
+        self.assertEqual(data['conversion_rate'], 0.25)
+        self.assertEqual(data['per_rep'][0]['converted'], 1)
+
+    def test_funnel_api_rejects_bad_dates(self):
+        client = Client()
+        client.login(username="staff", password="pass")
+        response = client.get(reverse('api_funnel_analytics'), {'from': '2024-02-30'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_funnel_api_rejects_unparseable_dates(self):
+        """Not a date at all is a 400, not a silent fallback to the last 30 days"""
+        client = Client()
+        client.login(username="staff", password="pass")
+        self.assertEqual(client.get(reverse('api_funnel_analytics'), {'from': 'abc'}).status_code, 400)
+        self.assertEqual(client.get(reverse('api_funnel_analytics'), {'to': 'yesterday'}).status_code, 400)
+
+    def test_funnel_api_rejects_reversed_range(self):
+        client = Client()
+        client.login(username="staff", password="pass")
+        response = client.get(reverse('api_funnel_analytics'), {'from': '2024-03-01', 'to': '2024-02-01'})
+        self.assertEqual(response.status_code, 400)
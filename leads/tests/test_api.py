@@ -0,0 +1,192 @@
+import gzip
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth.models import Permission, User
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from leads.models import ActionLog, FollowUp, Lead, StatusTransition
+from leads.serializers import LeadBatchSerializer, LeadWriteSerializer
+
+@override_settings(LEAD_AUTO_ASSIGN=False)
+class LeadWriteAPITest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="integration", password="pass")
+        self.user.user_permissions.add(*Permission.objects.filter(codename__in=['add_lead', 'change_lead']))
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_create_lead(self):
+        response = self.client.post(reverse('api_lead_list'), {
+            'name': "John Doe", 'email': "john@example.com", 'phone': "1234567890",
+        }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        lead = Lead.objects.get(pk=response.data['id'])
+        self.assertEqual(lead.status, 'new')
+        self.assertTrue(ActionLog.objects.filter(lead=lead, action='create', user=self.user).exists())
+        self.assertTrue(StatusTransition.objects.filter(lead=lead, to_status='new').exists())
+
+    def test_create_validates_like_the_form(self):
+        Lead.objects.create(name="Jane", email="jane@example.com", phone="1234567890")
+
+        response = self.client.post(reverse('api_lead_list'), {
+            'name': "Jane", 'email': "jane@example.com", 'phone': "123",
+        }, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.data)
+        self.assertIn('phone', response.data)
+
+    def post_batch(self, start, count):
+        rows = [
+            {'name': f"Lead {i}", 'email': f"lead{i}@example.com", 'phone': f"55500000{i:02d}"}
+            for i in range(start, start + count)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('api_lead_batch_create'), rows, format='json')
+        return response, len(queries)
+
+    def test_batch_create(self):
+        """A batch costs the same number of queries whatever its size"""
+        small, small_queries = self.post_batch(0, 2)
+        large, large_queries = self.post_batch(2, 50)
+
+        self.assertEqual(large.status_code, 201)
+        self.assertEqual(large.data['created'], 50)
+        self.assertEqual(len(large.data['ids']), 50)
+        self.assertEqual(Lead.objects.count(), 52)
+        self.assertEqual(ActionLog.objects.filter(action='create').count(), 52)
+        self.assertEqual(small_queries, large_queries)
+
+    def test_batch_is_all_or_nothing(self):
+        Lead.objects.create(name="Taken", email="taken@example.com")
+        rows = [
+            {'name': "Fresh", 'email': "fresh@example.com", 'phone': "1234567890"},
+            {'name': "Taken", 'email': "taken@example.com", 'phone': "1234567890"},
+        ]
+
+        response = self.client.post(reverse('api_lead_batch_create'), rows, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("taken@example.com", str(response.data))
+        self.assertFalse(Lead.objects.filter(email="fresh@example.com").exists())
+
+    def test_concurrent_insert_is_a_conflict(self):
+        """An email taken after validation passed is a 409 naming it, not a 500"""
+        Lead.objects.create(name="Taken", email="taken@example.com")
+        rows = [
+            {'name': "Fresh", 'email': "fresh@example.com", 'phone': "1234567890"},
+            {'name': "Taken", 'email': "taken@example.com", 'phone': "1234567890"},
+        ]
+
+        # validation ran before the other request's insert
+        with mock.patch.object(LeadBatchSerializer, 'validate', lambda self, attrs: attrs):
+            response = self.client.post(reverse('api_lead_batch_create'), rows, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['emails'], ["taken@example.com"])
+        self.assertFalse(Lead.objects.filter(email="fresh@example.com").exists())
+
+        with mock.patch.object(LeadWriteSerializer, 'validate_email', lambda self, email: email):
+            response = self.client.post(reverse('api_lead_list'), rows[1], format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['emails'], ["taken@example.com"])
+
+    def test_concurrent_email_change_is_a_conflict(self):
+        Lead.objects.create(name="Taken", email="taken@example.com")
+        lead = Lead.objects.create(name="John Doe", email="john@example.com", phone="1234567890")
+
+        with mock.patch.object(LeadWriteSerializer, 'validate_email', lambda self, email: email):
+            response = self.client.patch(reverse('api_lead_detail', args=[lead.pk]), {'email': "taken@example.com"}, format='json')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['emails'], ["taken@example.com"])
+        self.assertFalse(ActionLog.objects.filter(lead=lead, action='update').exists())
+
+    @mock.patch('leads.services.ActionLog.objects.create', side_effect=RuntimeError("audit down"))
+    def test_failed_create_leaves_no_lead(self, create_log):
+        """A side effect failing rolls the whole create back"""
+        with self.assertRaises(RuntimeError):
+            self.client.post(reverse('api_lead_list'), {
+                'name': "John Doe", 'email': "john@example.com", 'phone': "1234567890",
+            }, format='json')
+
+        self.assertFalse(Lead.objects.filter(email="john@example.com").exists())
+        self.assertFalse(StatusTransition.objects.exists())
+
+    @override_settings(LEAD_API_BATCH_LIMIT=2)
+    def test_batch_limit(self):
+        rows = [{'name': "L", 'email': f"l{i}@example.com", 'phone': "1234567890"} for i in range(3)]
+        response = self.client.post(reverse('api_lead_batch_create'), rows, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_create_ndjson(self):
+        body = "\n".join(json.dumps({'name': f"N{i}", 'email': f"n{i}@example.com", 'phone': "1234567890"}) for i in range(3))
+
+        response = self.client.post(
+            reverse('api_lead_batch_create'), body,
+            content_type='application/x-ndjson', HTTP_ACCEPT='application/x-ndjson',
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(json.loads(response.content.decode().strip())['created'], 3)
+
+    def test_patch_lead(self):
+        lead = Lead.objects.create(name="John Doe", email="john@example.com", phone="1234567890")
+
+        response = self.client.patch(reverse('api_lead_detail', args=[lead.pk]), {'status': 'in_progress'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'in_progress')
+        lead.refresh_from_db()
+        self.assertEqual(lead.status, 'in_progress')
+        self.assertTrue(ActionLog.objects.filter(lead=lead, action='update').exists())
+
+    @override_settings(LEAD_AUTO_ASSIGN=True)
+    def test_creator_can_patch_auto_assigned_lead(self):
+        """Auto-assignment to someone else doesn't lock the creator out"""
+        staff = User.objects.create_user(username="staff", is_staff=True)
+        response = self.client.post(reverse('api_lead_list'), {
+            'name': "John Doe", 'email': "john@example.com", 'phone': "1234567890",
+        }, format='json')
+        self.assertEqual(Lead.objects.get(pk=response.data['id']).assigned_to, staff)
+
+        response = self.client.patch(reverse('api_lead_detail', args=[response.data['id']]), {'status': 'in_progress'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_patch_needs_change_permission(self):
+        lead = Lead.objects.create(name="John Doe", email="john@example.com", phone="1234567890")
+        self.user.user_permissions.remove(Permission.objects.get(codename='change_lead'))
+
+        response = self.client.patch(reverse('api_lead_detail', args=[lead.pk]), {'status': 'lost'}, format='json')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_add_followup(self):
+        lead = Lead.objects.create(name="John Doe", email="john@example.com", phone="1234567890")
+
+        response = self.client.post(
+            reverse('api_lead_followup_create', args=[lead.pk]), {'comment': "Called back"}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(FollowUp.objects.get(lead=lead).comment, "Called back")
+
+    def test_requires_authentication(self):
+        response = APIClient().post(reverse('api_lead_batch_create'), [], format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_json_responses_are_compressed(self):
+        for i in range(10):
+            Lead.objects.create(name=f"Lead {i}", email=f"lead{i}@example.com", phone="1234567890")
+
+        response = self.client.get(reverse('api_lead_list'), HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 10)
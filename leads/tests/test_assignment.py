@@ -0,0 +1,76 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from leads.models import AssignmentProfile, Lead
+from leads.assignment import assign_backlog, assign_lead, get_loads
+from leads.fragments import get_generation
+from leads.scoping import assignment_deltas, build_scope
+
+class AssignmentTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user(username="alice", password="pass", is_staff=True)
+        self.bob = User.objects.create_user(username="bob", password="pass", is_staff=True)
+        # not staff, never gets leads
+        User.objects.create_user(username="customer", password="pass")
+
+    def make_leads(self, count, **kwargs):
+        return [Lead.objects.create(name=f"L{i}", email=f"l{i}@example.com", **kwargs) for i in range(count)]
+
+    @override_settings(LEAD_ASSIGNMENT_STRATEGY='least_loaded')
+    def test_assign_lead_picks_least_loaded(self):
+        """New lead goes to the user with fewer open leads"""
+        Lead.objects.create(name="Old", email="old@example.com", assigned_to=self.alice)
+        lead = Lead.objects.create(name="New", email="new@example.com")
+
+        self.assertEqual(assign_lead(lead), self.bob.pk)
+        self.assertEqual(get_loads([self.alice.pk, self.bob.pk]), {self.alice.pk: 1, self.bob.pk: 1})
+
+    def test_assign_lead_never_reassigns(self):
+        """A lead that already has an owner is left alone"""
+        lead = Lead.objects.create(name="Taken", email="taken@example.com", assigned_to=self.alice)
+        self.assertIsNone(assign_lead(lead))
+        lead.refresh_from_db()
+        self.assertEqual(lead.assigned_to, self.alice)
+
+    @override_settings(LEAD_ASSIGNMENT_STRATEGY='weighted')
+    def test_backlog_respects_capacity(self):
+        """Weighted strategy splits the backlog by capacity"""
+        AssignmentProfile.objects.create(user=self.alice, capacity=3)
+        self.make_leads(8)
+
+        self.assertEqual(assign_backlog(batch_size=3), 8)
+        self.assertEqual(Lead.objects.filter(assigned_to=self.alice).count(), 6)
+        self.assertEqual(Lead.objects.filter(assigned_to=self.bob).count(), 2)
+
+    @override_settings(LEAD_ASSIGNMENT_STRATEGY='round_robin')
+    def test_backlog_round_robin_skips_closed_leads(self):
+        """Round robin alternates users and ignores converted leads"""
+        self.make_leads(4)
+        Lead.objects.create(name="Won", email="won@example.com", status="converted")
+
+        self.assertEqual(assign_backlog(), 4)
+        self.assertEqual(Lead.objects.filter(assigned_to=self.alice).count(), 2)
+        self.assertEqual(Lead.objects.filter(assigned_to=self.bob).count(), 2)
+        self.assertTrue(Lead.objects.filter(email="won@example.com", assigned_to__isnull=True).exists())
+
+    @override_settings(LEAD_ASSIGNMENT_STRATEGY='round_robin')
+    @mock.patch('leads.events.get_events_client')
+    def test_backlog_invalidates_lists_and_dashboard_counts(self, get_client):
+        """One generation bump and one event, out-of-scope viewers lose the pool leads"""
+        self.make_leads(4)
+        before = get_generation()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assign_backlog(batch_size=2)
+
+        self.assertEqual(get_generation(), before + 1)
+        get_client.return_value.publish.assert_called_once()
+        event = json.loads(get_client.return_value.publish.call_args.args[1])
+        self.assertEqual(event['type'], 'batch_assigned')
+        # alice still sees her own two, loses bob's two
+        self.assertEqual(assignment_deltas(event, build_scope(self.alice)), {'total_leads': -2, 'new_leads': -2})
+        self.assertEqual(assignment_deltas(event, build_scope(User.objects.create_superuser("admin"))), {})
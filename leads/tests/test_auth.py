@@ -0,0 +1,61 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from leads.tasks import clear_expired_sessions
+
+class CachedAuthTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches['sessions'].clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(caches['sessions'].clear)
+        self.user = User.objects.create_superuser(username="admin", password="pass")
+        self.client = Client()
+        self.client.login(username="admin", password="pass")
+
+    def test_warm_request_skips_session_and_user_queries(self):
+        self.client.get(reverse('lead_list'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('lead_list'))
+
+        self.assertEqual(response.status_code, 200)
+        sql = " ".join(query['sql'] for query in queries)
+        self.assertNotIn('"django_session"', sql)
+        self.assertNotIn('"auth_user"', sql)
+
+    def test_password_change_logs_out(self):
+        self.client.get(reverse('lead_list'))
+
+        self.user.set_password("new-pass")
+        self.user.save()
+
+        response = self.client.get(reverse('lead_list'))
+        self.assertRedirects(response, f"{reverse('login')}?next={reverse('lead_list')}", fetch_redirect_response=False)
+
+    def test_deactivation_logs_out(self):
+        self.client.get(reverse('lead_list'))
+
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(reverse('lead_list'))
+        self.assertEqual(response.status_code, 302)
+
+
+class ClearExpiredSessionsTest(TestCase):
+    def test_deletes_only_expired(self):
+        now = timezone.now()
+        Session.objects.create(session_key="expired", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+        clear_expired_sessions()
+
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ["live"])
@@ -0,0 +1,124 @@
+import time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
+from django.urls import reverse
+from leads import db_router
+from leads.db_router import STICKY_COOKIE, ReplicaRouter, ReplicaRoutingMiddleware, replica_reads
+from leads.models import Lead
+
+@override_settings(REPLICA_DATABASES=['replica1', 'replica2'])
+@mock.patch('leads.db_router.replica_lag', return_value=0.0)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        db_router._freshness.clear()
+        self.addCleanup(db_router._freshness.clear)
+        self.router = ReplicaRouter()
+
+    def run_view(self, view, cookies=None):
+        """Run a view through the middleware, returns (response, aliases it read from)"""
+        used = []
+
+        def recording_view(request):
+            used.append(self.router.db_for_read(Lead))
+            used.append(self.router.db_for_read(Lead))
+            return view(request)
+
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaRoutingMiddleware(replica_reads(recording_view))(request)
+        return response, used
+
+    def test_read_only_view_uses_one_replica(self, lag):
+        _, used = self.run_view(lambda request: HttpResponse())
+        self.assertIn(used[0], ['replica1', 'replica2'])
+        self.assertEqual(used[0], used[1])
+
+    def test_other_code_reads_from_primary(self, lag):
+        self.assertEqual(self.router.db_for_read(Lead), 'default')
+
+    def test_recent_writer_is_pinned_to_primary(self, lag):
+        _, used = self.run_view(lambda request: HttpResponse(), cookies={STICKY_COOKIE: str(time.time())})
+        self.assertEqual(used, ['default', 'default'])
+
+        expired = str(time.time() - 60)
+        _, used = self.run_view(lambda request: HttpResponse(), cookies={STICKY_COOKIE: expired})
+        self.assertNotIn('default', used)
+
+    def test_write_sets_sticky_cookie(self, lag):
+        def writing_view(request):
+            self.router.db_for_write(Lead)
+            return HttpResponse()
+
+        response, _ = self.run_view(writing_view)
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def test_session_save_is_not_sticky(self, lag):
+        def session_view(request):
+            self.router.db_for_write(Session)
+            return HttpResponse()
+
+        response, _ = self.run_view(session_view)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_lagging_replicas_are_skipped(self, lag):
+        lag.side_effect = lambda alias: 60.0 if alias == 'replica1' else 0.5
+        for _ in range(5):
+            _, used = self.run_view(lambda request: HttpResponse())
+            self.assertEqual(used[0], 'replica2')
+        # lag is checked once per interval, not per request
+        self.assertEqual(lag.call_count, 2)
+
+    def test_falls_back_to_primary_when_all_lag(self, lag):
+        lag.return_value = 60.0
+        _, used = self.run_view(lambda request: HttpResponse())
+        self.assertEqual(used, ['default', 'default'])
+
+    def test_replicas_are_not_migrated(self, lag):
+        # replica2, replica1 may be the local SQLite stand-in which is migrated
+        self.assertFalse(self.router.allow_migrate('replica2', 'leads'))
+        self.assertIsNone(self.router.allow_migrate('default', 'leads'))
+
+
+class ReadYourWritesTest(TestCase):
+    def test_create_pins_user_to_primary(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser(username="admin", password="pass"))
+
+        response = client.post(reverse('lead_create'), {
+            'name': "John Doe",
+            'email': "john@example.com",
+            'phone': "1234567890",
+        })
+
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        self.assertTrue(db_router.recently_wrote(client.get(reverse('lead_list')).wsgi_request))
+
+
+@skipUnless(settings.LOCAL_REPLICA_SQLITE, "needs a local second database, set LOCAL_REPLICA_SQLITE")
+class ReplicaDatabaseTest(TransactionTestCase):
+    """Against a real second database. Not TestCase: its open transaction on default pins reads to the primary."""
+    # the runner sets up the databases of skipped tests too
+    databases = {'default', 'replica1'} if settings.LOCAL_REPLICA_SQLITE else {'default'}
+
+    def setUp(self):
+        db_router._freshness.clear()
+        self.addCleanup(db_router._freshness.clear)
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser(username="admin", password="pass"))
+
+    def test_replica_reads_view_reads_from_replica(self):
+        Lead.objects.create(name="Primary Lead", email="primary@example.com")
+        Lead.objects.using('replica1').create(name="Replica Lead", email="replica@example.com")
+
+        response = self.client.get(reverse('api_lead_list'))
+
+        self.assertEqual([lead['name'] for lead in response.json()], ["Replica Lead"])
+
+    def test_other_views_read_from_primary(self):
+        Lead.objects.using('replica1').create(name="Replica Lead", email="replica@example.com")
+        self.assertFalse(Lead.objects.exists())
@@ -0,0 +1,110 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.urls import NoReverseMatch, reverse
+from django.contrib.auth.models import User
+from leads.models import ActionLog, DuplicateCandidate, FollowUp, Lead
+from leads.dedupe import _blocks, index_lead, match_keys, detect_duplicates, normalize_email, scan_duplicates, soundex
+
+class DedupeKeysTest(TestCase):
+    def test_normalize_email(self):
+        """Case, +tags and Gmail dots don't make a different person"""
+        self.assertEqual(normalize_email(" John.Doe+crm@GoogleMail.com"), "johndoe@gmail.com")
+        self.assertEqual(normalize_email("john.doe@example.com"), "john.doe@example.com")
+
+    def test_name_key_is_phonetic_and_order_independent(self):
+        self.assertEqual(soundex("Robert"), soundex("Rupert"))
+        self.assertEqual(
+            match_keys("Jon Smyth", "", ""),
+            match_keys("Smith John", "", ""),
+        )
+
+class DedupeDetectionTest(TestCase):
+    def setUp(self):
+        self.original = Lead.objects.create(name="John Smith", email="john.smith@gmail.com", phone="5551234567")
+        index_lead(self.original)
+
+    def test_detects_reformatted_duplicate(self):
+        """Same person with a dotted Gmail address and a formatted phone"""
+        lead = Lead.objects.create(name="Jon Smith", email="johnsmith+x@gmail.com", phone="(555) 123-4567")
+        index_lead(lead)
+
+        self.assertEqual(detect_duplicates(lead), [self.original])
+        pair = DuplicateCandidate.objects.get()
+        self.assertEqual((pair.lead, pair.duplicate_of), (lead, self.original))
+
+    def test_same_phone_different_person_not_flagged(self):
+        lead = Lead.objects.create(name="Mary Jones", email="mary@example.com", phone="5551234567")
+        index_lead(lead)
+        self.assertEqual(detect_duplicates(lead), [])
+
+    def test_name_with_partial_contact_match_is_flagged(self):
+        """Found through the name block only: new email domain and a new area code"""
+        lead = Lead.objects.create(name="Jon Smith", email="john.smith@acme.com", phone="4151234567")
+        index_lead(lead)
+
+        self.assertEqual(detect_duplicates(lead), [self.original])
+        self.assertIn('email name', DuplicateCandidate.objects.get().reasons)
+
+    def test_same_name_alone_not_flagged(self):
+        lead = Lead.objects.create(name="John Smith", email="jsmith@acme.com", phone="4159990000")
+        index_lead(lead)
+        self.assertEqual(detect_duplicates(lead), [])
+
+    @mock.patch('leads.dedupe.MAX_BLOCK_SIZE', 2)
+    def test_blocks_are_capped_per_key(self):
+        """A common key contributes only the newest MAX_BLOCK_SIZE leads"""
+        smiths = [Lead.objects.create(name="John Smith", email=f"smith{i}@example.com") for i in range(3)]
+        for lead in smiths:
+            index_lead(lead)
+
+        blocks = _blocks(match_keys("John Smith", "", ""))
+        self.assertEqual(list(blocks.values()), [[smiths[1].pk, smiths[2].pk]])
+
+    def test_batch_scan_backfills_index(self):
+        """Leads created without match keys are indexed and compared by the scan"""
+        Lead.objects.create(name="John Smith", email="johnsmith@gmail.com")
+        self.assertEqual(scan_duplicates(chunk_size=1), 1)
+        self.assertEqual(DuplicateCandidate.objects.count(), 1)
+
+class DuplicateMergeViewTest(TestCase):
+    def setUp(self):
+        User.objects.create_superuser(username="admin", password="pass")
+        self.client = Client()
+        self.client.login(username="admin", password="pass")
+
+    def test_merge_repoints_history(self):
+        """Merging moves follow-ups and logs to the older lead and soft deletes the newer"""
+        older = Lead.objects.create(name="John Smith", email="john@example.com")
+        newer = Lead.objects.create(name="John Smith", email="j.smith@example.com")
+        FollowUp.objects.create(lead=newer, comment="Called")
+        ActionLog.objects.create(lead=newer, action='create')
+        pair = DuplicateCandidate.objects.create(lead=newer, duplicate_of=older, score=0.7, reasons="name")
+
+        response = self.client.post(reverse('duplicate_resolve', args=[pair.pk, 'merge']))
+
+        self.assertRedirects(response, reverse('duplicate_list'))
+        newer.refresh_from_db()
+        pair.refresh_from_db()
+        self.assertTrue(newer.is_deleted)
+        self.assertEqual(pair.status, 'merged')
+        self.assertEqual(FollowUp.objects.get().lead, older)
+        self.assertFalse(ActionLog.objects.filter(lead=newer).exists())
+        self.assertTrue(ActionLog.objects.filter(lead=older, action='merge').exists())
+
+    def test_only_merge_and_dismiss_are_routed(self):
+        with self.assertRaises(NoReverseMatch):
+            reverse('duplicate_resolve', args=[1, 'delete'])
+        self.assertEqual(self.client.post('/leads/duplicates/1/delete/').status_code, 404)
+
+    def test_pair_with_deleted_lead_is_rejected(self):
+        older = Lead.objects.create(name="John Smith", email="john@example.com", is_deleted=True)
+        newer = Lead.objects.create(name="John Smith", email="j.smith@example.com")
+        pair = DuplicateCandidate.objects.create(lead=newer, duplicate_of=older, score=0.7, reasons="name")
+
+        self.client.post(reverse('duplicate_resolve', args=[pair.pk, 'merge']))
+
+        newer.refresh_from_db()
+        pair.refresh_from_db()
+        self.assertFalse(newer.is_deleted)
+        self.assertEqual(pair.status, 'pending')
@@ -0,0 +1,123 @@
+import asyncio
+import json
+from unittest import mock
+
+from django.test import RequestFactory, SimpleTestCase, TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+from leads.models import Lead
+from leads.events import LEAD_EVENTS_CHANNEL, LeadEventHub, publish_lead_event
+from leads.views import dashboard_stream
+
+class LeadEventsTest(TestCase):
+    def setUp(self):
+        self.lead = Lead.objects.create(name="John Doe", email="john@example.com", status="new")
+
+    @mock.patch('leads.events.get_events_client')
+    def test_publish_waits_for_commit(self, get_client):
+        """Nothing is published until the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            publish_lead_event('created', self.lead, deltas={'total_leads': 1})
+        get_client.return_value.publish.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        channel, message = get_client.return_value.publish.call_args.args
+        self.assertEqual(channel, LEAD_EVENTS_CHANNEL)
+        payload = json.loads(message)
+        self.assertEqual(payload['type'], 'created')
+        self.assertEqual(payload['lead']['id'], self.lead.pk)
+        self.assertEqual(payload['deltas'], {'total_leads': 1})
+
+    @mock.patch('leads.services.publish_lead_event')
+    def test_status_change_moves_count(self, publish):
+        """Changing status sends -1/+1 deltas for the two status cards"""
+        User.objects.create_superuser(username="admin", password="pass")
+        client = Client()
+        client.login(username="admin", password="pass")
+
+        client.post(reverse('lead_update', args=[self.lead.pk]), {
+            'name': self.lead.name,
+            'email': self.lead.email,
+            'phone': '1234567890',
+            'status': 'converted',
+        })
+
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.kwargs['deltas'], {'new_leads': -1, 'converted_leads': 1})
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        for message in self.messages:
+            yield message
+        await asyncio.Event().wait()  # stay subscribed
+
+    async def aclose(self):
+        pass
+
+
+class LeadEventHubTest(SimpleTestCase):
+    async def test_one_subscription_for_all_streams(self):
+        message = {'type': 'message', 'data': json.dumps({'type': 'created', 'lead': None, 'deltas': {}}).encode()}
+        client = mock.Mock(pubsub=lambda: FakePubSub([message]), aclose=mock.AsyncMock())
+        hub = LeadEventHub()
+
+        with mock.patch('leads.events.aioredis.from_url', return_value=client) as from_url:
+            first, second = hub.subscribe(), hub.subscribe()
+            (event, _), (other, _) = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), 1)
+
+            self.assertEqual(from_url.call_count, 1)
+            self.assertEqual(event['type'], 'created')
+            self.assertEqual(other, event)
+
+            reader = hub._reader
+            hub.unsubscribe(first)
+            hub.unsubscribe(second)
+            await asyncio.sleep(0)
+            self.assertTrue(reader.cancelled())
+
+    def test_slow_stream_drops_events(self):
+        hub = LeadEventHub()
+        queue = asyncio.Queue(maxsize=1)
+        hub._queues.add(queue)
+
+        hub.dispatch('{"n": 1}')
+        hub.dispatch('{"n": 2}')
+
+        self.assertEqual(queue.get_nowait()[0], {'n': 1})
+        self.assertTrue(queue.empty())
+
+
+class DashboardStreamScopeTest(TestCase):
+    async def test_events_outside_scope_are_dropped(self):
+        """Other users' leads never reach the browser, batch count deltas included"""
+        alice = await User.objects.acreate(username="alice", is_staff=True)
+        bob = await User.objects.acreate(username="bob", is_staff=True)
+        queue = asyncio.Queue()
+        for event in [
+            {'type': 'created', 'lead': {'id': 1, 'assigned_to': bob.pk, 'created_by': bob.pk}, 'deltas': {}},
+            {'type': 'batch_created', 'lead': None, 'assigned_to': bob.pk, 'created_by': bob.pk, 'deltas': {'total_leads': 5}},
+            {'type': 'created', 'lead': {'id': 2, 'assigned_to': bob.pk, 'created_by': alice.pk}, 'deltas': {}},
+        ]:
+            queue.put_nowait((event, json.dumps(event)))
+
+        async def auser():
+            return alice
+
+        request = RequestFactory().get(reverse('dashboard_stream'))
+        request.user, request.auser = alice, auser
+        with mock.patch('leads.views.event_hub') as hub:
+            hub.subscribe.return_value = queue
+            response = await dashboard_stream(request)
+            stream = aiter(response.streaming_content)
+            chunks = [await anext(stream) for _ in range(2)]
+
+        self.assertEqual(chunks[0], b"retry: 5000\n\n")
+        self.assertIn(b'"id": 2', chunks[1])  # the lead alice created, assigned to bob
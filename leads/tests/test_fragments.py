@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from leads.fragments import bump_generation, get_generation
+from leads.models import Lead
+from leads.reminders import process_due_reminders
+from leads.services import add_followup
+
+class LeadListRenderingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.create_superuser(username="admin", password="pass")
+        self.client = Client()
+        self.client.login(username="admin", password="pass")
+
+    def test_pagination_is_windowed(self):
+        Lead.objects.bulk_create([Lead(name=f"Lead {i}", email=f"lead{i}@example.com") for i in range(100)])
+
+        response = self.client.get(reverse('lead_list'), {'page': 10})
+
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 20)
+        self.assertContains(response, "page=1\"", count=2)   # first page, above and below
+        self.assertContains(response, "page=20\"", count=2)  # last page
+        self.assertContains(response, "page=12\"", count=2)
+        self.assertNotContains(response, "page=5\"")
+        self.assertContains(response, "…", count=4)
+
+    def test_cached_page_holds_only_its_rows(self):
+        """A cache hit runs no lead queries, and a miss never loads the whole table"""
+        Lead.objects.bulk_create([Lead(name=f"Lead {i}", email=f"lead{i}@example.com") for i in range(20)])
+
+        with CaptureQueriesContext(connection) as miss:
+            self.client.get(reverse('lead_list'), {'page': 2})
+        lead_queries = [q['sql'] for q in miss if 'FROM "leads_lead"' in q['sql']]
+        self.assertEqual(len(lead_queries), 2)  # COUNT and one LIMITed page
+        self.assertTrue(all('COUNT' in sql or 'LIMIT 5' in sql for sql in lead_queries))
+
+        with CaptureQueriesContext(connection) as hit:
+            response = self.client.get(reverse('lead_list'), {'page': 2})
+        self.assertFalse([q for q in hit if 'FROM "leads_lead"' in q['sql']])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 4)
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_rows_are_cached_until_generation_changes(self):
+        lead = Lead.objects.create(name="Old Name", email="john@example.com")
+        self.assertContains(self.client.get(reverse('lead_list')), "Old Name")
+
+        Lead.objects.filter(pk=lead.pk).update(name="New Name")
+        self.assertContains(self.client.get(reverse('lead_list')), "Old Name")
+
+        bump_generation()
+        self.assertContains(self.client.get(reverse('lead_list')), "New Name")
+
+    @mock.patch('leads.events.get_events_client')
+    def test_reminders_and_followups_keep_the_cache(self, get_client):
+        lead = Lead.objects.create(name="John Doe", email="john@example.com", next_followup_at=timezone.now())
+        before = get_generation()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_due_reminders()
+            add_followup(lead, None, "Called")
+
+        self.assertEqual(get_generation(), before)
+
+    @mock.patch('leads.events.get_events_client')
+    def test_lead_events_bump_generation(self, get_client):
+        before = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('lead_create'), {
+                'name': "John Doe",
+                'email': "john@example.com",
+                'phone': "1234567890",
+            })
+        self.assertEqual(get_generation(), before + 1)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth.models import User
+from leads.models import ActionLog, Lead, Reminder
+from leads.dedupe import merge_leads
+from leads.reminders import process_due_reminders
+
+class ReminderTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="staff", password="pass", is_staff=True)
+        now = timezone.now()
+        self.due_at = now - timedelta(minutes=5)
+        self.due = Lead.objects.create(
+            name="Due", email="due@example.com", assigned_to=self.user,
+            next_followup_at=self.due_at,
+        )
+        self.later = Lead.objects.create(
+            name="Later", email="later@example.com", next_followup_at=now + timedelta(days=1),
+        )
+
+    def test_due_reminders_processed_once(self):
+        """Due reminders are logged and cleared, future ones are left alone"""
+        self.assertEqual(process_due_reminders(batch_size=1), 1)
+        self.assertEqual(process_due_reminders(), 0)
+
+        self.due.refresh_from_db()
+        self.later.refresh_from_db()
+        self.assertIsNone(self.due.next_followup_at)
+        self.assertIsNotNone(self.later.next_followup_at)
+        log = ActionLog.objects.get(action='reminder')
+        self.assertEqual((log.lead, log.user), (self.due, None))  # nobody performed it
+        reminder = Reminder.objects.get()
+        self.assertEqual((reminder.lead, reminder.user), (self.due, self.user))
+        self.assertEqual(reminder.due_at, self.due_at)
+
+    @mock.patch('leads.events.get_events_client')
+    def test_due_reminder_is_published(self, get_client):
+        with self.captureOnCommitCallbacks(execute=True):
+            process_due_reminders()
+
+        channel, message = get_client.return_value.publish.call_args.args
+        self.assertIn('"type": "reminder"', message)
+        self.assertIn(f'"user": {self.user.pk}', message)
+
+    def test_dashboard_lists_and_dismisses_reminders(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        process_due_reminders()
+        client = Client()
+        client.login(username="staff", password="pass")
+
+        response = client.get(reverse('dashboard'))
+        self.assertEqual([r.lead for r in response.context['due_reminders']], [self.due])
+        self.assertContains(response, f"Due {timezone.localtime(self.due_at):%Y-%m-%d %H:%M}")
+
+        reminder = Reminder.objects.get()
+        client.post(reverse('reminder_dismiss', args=[reminder.pk]))
+        self.assertEqual(list(client.get(reverse('dashboard')).context['due_reminders']), [])
+
+    def test_deleted_and_merged_leads_leave_the_list(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        older = Lead.objects.create(name="Older", email="older@example.com", assigned_to=self.user)
+        Reminder.objects.create(lead=self.later, user=self.user, due_at=self.due_at)
+        process_due_reminders()
+        User.objects.create_superuser(username="admin", password="pass")
+        admin = Client()
+        admin.login(username="admin", password="pass")
+
+        admin.post(reverse('lead_delete', args=[self.due.pk]))
+        merge_leads(self.later, older)
+
+        self.assertTrue(Reminder.objects.get(lead=self.due).dismissed_at)
+        self.assertEqual(Reminder.objects.get(due_at=self.due_at, dismissed_at__isnull=True).lead, older)
+        client = Client()
+        client.login(username="staff", password="pass")
+        self.assertEqual([r.lead for r in client.get(reverse('dashboard')).context['due_reminders']], [older])
+
+    def test_update_view_schedules_followup(self):
+        """Next follow-up can be set from the update form"""
+        User.objects.create_superuser(username="admin", password="pass")
+        client = Client()
+        client.login(username="admin", password="pass")
+
+        client.post(reverse('lead_update', args=[self.later.pk]), {
+            'name': self.later.name,
+            'email': self.later.email,
+            'phone': '1234567890',
+            'status': 'new',
+            'next_followup_at': '2030-01-02T09:30',
+        })
+
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.next_followup_at.isoformat(), '2030-01-02T09:30:00+00:00')
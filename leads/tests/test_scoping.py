@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, RequestFactory
+from django.urls import reverse
+from django.contrib.auth.models import Group, Permission, User
+from leads.models import DuplicateCandidate, Lead
+from leads.scoping import get_scope, has_lead_perm
+
+class LeadScopingTest(TestCase):
+    def setUp(self):
+        # list pages are cached per scope key, don't leak them into other tests
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.alice = User.objects.create_user(username="alice", password="pass", is_staff=True)
+        self.bob = User.objects.create_user(username="bob", password="pass", is_staff=True)
+        self.carol = User.objects.create_user(username="carol", password="pass", is_staff=True)
+        Lead.objects.create(name="Alice Lead", email="a@example.com", assigned_to=self.alice)
+        Lead.objects.create(name="Bob Lead", email="b@example.com", assigned_to=self.bob)
+        Lead.objects.create(name="Pool Lead", email="p@example.com")
+
+    def list_for(self, username):
+        client = Client()
+        client.login(username=username, password="pass")
+        return client.get(reverse('lead_list'))
+
+    def test_user_sees_own_and_unassigned(self):
+        response = self.list_for("alice")
+        self.assertContains(response, "Alice Lead")
+        self.assertContains(response, "Pool Lead")
+        self.assertNotContains(response, "Bob Lead")
+
+    def test_team_members_share_leads(self):
+        team = Group.objects.create(name="Sales")
+        team.user_set.add(self.alice, self.bob)
+        self.assertContains(self.list_for("alice"), "Bob Lead")
+        self.assertNotContains(self.list_for("carol"), "Bob Lead")
+
+    def test_view_all_permission(self):
+        self.carol.user_permissions.add(Permission.objects.get(codename='view_all_leads'))
+        response = self.list_for("carol")
+        self.assertContains(response, "Alice Lead")
+        self.assertContains(response, "Bob Lead")
+
+    def test_api_is_scoped(self):
+        client = Client()
+        client.login(username="bob", password="pass")
+        names = [lead['name'] for lead in client.get(reverse('api_lead_list')).json()]
+        self.assertEqual(sorted(names), ["Bob Lead", "Pool Lead"])
+
+    def test_creator_keeps_seeing_assigned_lead(self):
+        Lead.objects.create(name="Handed Over", email="h@example.com", assigned_to=self.bob, created_by=self.alice)
+        self.assertContains(self.list_for("alice"), "Handed Over")
+        self.assertNotContains(self.list_for("carol"), "Handed Over")
+
+    def test_duplicate_list_is_scoped(self):
+        """Pairs involving a lead the user can't see don't leak its contact details"""
+        for username in ("alice", "bob"):
+            User.objects.get(username=username).user_permissions.add(Permission.objects.get(codename='change_lead'))
+        alice_lead, bob_lead, pool_lead = Lead.objects.order_by('pk')
+        DuplicateCandidate.objects.create(lead=pool_lead, duplicate_of=bob_lead, score=0.7, reasons="name")
+
+        client = Client()
+        client.login(username="alice", password="pass")
+        self.assertNotContains(client.get(reverse('duplicate_list')), "b@example.com")
+        client.login(username="bob", password="pass")
+        self.assertContains(client.get(reverse('duplicate_list')), "b@example.com")
+
+    def test_delete_uses_permission_and_scope(self):
+        """delete_lead is enough without superuser, and other users' leads are a 404"""
+        self.alice.user_permissions.add(Permission.objects.get(codename='delete_lead'))
+        client = Client()
+        client.login(username="alice", password="pass")
+        bob_lead = Lead.objects.get(name="Bob Lead")
+        alice_lead = Lead.objects.get(name="Alice Lead")
+
+        self.assertEqual(client.post(reverse('lead_delete', args=[bob_lead.pk])).status_code, 404)
+        client.post(reverse('lead_delete', args=[alice_lead.pk]))
+
+        bob_lead.refresh_from_db()
+        alice_lead.refresh_from_db()
+        self.assertFalse(bob_lead.is_deleted)
+        self.assertTrue(alice_lead.is_deleted)
+
+    def test_permissions_memoized_per_request(self):
+        """Second permission check on the same request runs no queries"""
+        request = RequestFactory().get('/')
+        request.user = self.alice
+        has_lead_perm(request, 'leads.change_lead')
+        with self.assertNumQueries(0):
+            has_lead_perm(request, 'leads.add_lead')
+            get_scope(request)
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from leads.models import FollowUp, Lead
+from leads.scoring import compute_scores, recompute_scores
+
+class ComputeScoresTest(TestCase):
+    def test_closed_leads_score_zero(self):
+        """Converted and lost leads have nothing left to chase"""
+        scores = compute_scores(
+            np.array(['converted', 'lost']),
+            age_days=np.array([1.0, 1.0]),
+            since_contact_days=np.array([10.0, 10.0]),
+            followup_counts=np.array([3.0, 3.0]),
+            action_counts=np.array([5.0, 5.0]),
+        )
+        self.assertEqual(scores.tolist(), [0.0, 0.0])
+
+    def test_in_progress_outranks_new(self):
+        """With equal signals an in-progress lead is worth more than a new one"""
+        scores = compute_scores(
+            np.array(['new', 'in_progress']),
+            age_days=np.array([2.0, 2.0]),
+            since_contact_days=np.array([2.0, 2.0]),
+            followup_counts=np.array([0.0, 0.0]),
+            action_counts=np.array([1.0, 1.0]),
+        )
+        self.assertGreater(scores[1], scores[0])
+
+class RecomputeScoresTest(TestCase):
+    def test_recompute_writes_scores(self):
+        """Batch job stores scores for active leads and skips soft-deleted ones"""
+        active = Lead.objects.create(name="A", email="a@example.com", status="in_progress")
+        other = Lead.objects.create(name="B", email="b@example.com", status="in_progress")
+        deleted = Lead.objects.create(name="C", email="c@example.com", is_deleted=True)
+        Lead.objects.filter(pk=active.pk).update(created_at=timezone.now() - timedelta(days=14))
+        FollowUp.objects.create(lead=other, comment="Called")
+
+        now = timezone.now()
+        with mock.patch('leads.scoring.timezone.now', return_value=now):
+            updated = recompute_scores(chunk_size=1)  # one lead per chunk exercises the keyset loop
+
+        self.assertEqual(updated, 2)
+        active.refresh_from_db()
+        other.refresh_from_db()
+        deleted.refresh_from_db()
+        self.assertGreater(active.score, 0)
+        self.assertGreater(other.score, 0)
+        self.assertEqual(deleted.score, 0)
+        # the next run 15 minutes later only drifts by time: below the tolerance, nothing written
+        with mock.patch('leads.scoring.timezone.now', return_value=now + timedelta(minutes=15)):
+            self.assertEqual(recompute_scores(), 0)
+
+    def test_recompute_writes_real_changes(self):
+        lead = Lead.objects.create(name="A", email="a@example.com", status="in_progress")
+        recompute_scores()
+        Lead.objects.filter(pk=lead.pk).update(status='converted')
+
+        self.assertEqual(recompute_scores(), 1)
+        lead.refresh_from_db()
+        self.assertEqual(lead.score, 0)
+
+class ScoreOnCreateTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_new_lead_is_on_first_page(self):
+        """A lead created through the form is scored at once, not left at 0 until the batch job"""
+        # older leads that were contacted recently, so a fresh lead should outrank them
+        for i in range(10):
+            lead = Lead.objects.create(name=f"Old {i}", email=f"old{i}@example.com", status="new")
+            FollowUp.objects.create(lead=lead, comment="Called")
+        Lead.objects.update(created_at=timezone.now() - timedelta(days=60))
+        recompute_scores()
+
+        User.objects.create_superuser(username="admin", password="pass")
+        client = Client()
+        client.login(username="admin", password="pass")
+        client.post(reverse('lead_create'), {'name': "Fresh Lead", 'email': "fresh@example.com", 'phone': "1234567890"})
+
+        self.assertGreater(Lead.objects.get(email="fresh@example.com").score, 0)
+        self.assertContains(client.get(reverse('lead_list')), "Fresh Lead")
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import TestCase
+from crm.celery import app
+from leads import tasks
+from leads.tasks import assign_unassigned_leads, scan_for_duplicates, send_due_reminders
+
+class CeleryTaskDefaultsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_routing(self):
+        """Batch jobs go to the bulk queue, reminders jump the default queue"""
+        bulk = app.amqp.router.route({}, 'leads.tasks.scan_for_duplicates')
+        quick = app.amqp.router.route({}, 'leads.tasks.send_due_reminders')
+
+        self.assertEqual(bulk['queue'].name, 'bulk')
+        self.assertEqual(app.amqp.router.route({}, 'leads.tasks.assign_unassigned_leads')['queue'].name, 'bulk')
+        self.assertTrue(assign_unassigned_leads.single_instance)
+        self.assertEqual(quick['queue'].name, 'default')
+        self.assertEqual(quick['priority'], 0)
+
+    def test_results_are_ignored_by_default(self):
+        self.assertTrue(scan_for_duplicates.ignore_result)
+        self.assertFalse(tasks.test_task.ignore_result)
+
+    @mock.patch('leads.tasks.process_due_reminders', side_effect=[OperationalError("server closed the connection"), 3])
+    def test_transient_errors_are_retried(self, process):
+        result = send_due_reminders.apply(throw=False)
+
+        self.assertEqual(result.get(), 3)
+        self.assertEqual(process.call_count, 2)
+
+    @mock.patch('leads.tasks.scan_duplicates', return_value=0)
+    def test_single_instance_skips_overlapping_run(self, scan):
+        key = scan_for_duplicates.idempotency_key((), {})
+        cache.add(key, 'running')
+
+        scan_for_duplicates.apply()
+        scan.assert_not_called()
+
+        cache.delete(key)
+        scan_for_duplicates.apply()
+        scan.assert_called_once()
+        self.assertIsNone(cache.get(key))  # lock released after the run
+
+    @mock.patch('leads.tasks.scan_duplicates', return_value=0)
+    def test_redelivered_message_reenters_its_lock(self, scan):
+        """A worker crashed mid-run: the same task id runs again, another one still skips"""
+        key = scan_for_duplicates.idempotency_key((), {})
+        cache.add(key, 'crashed-task-id')
+
+        scan_for_duplicates.apply(task_id='other-task-id')
+        scan.assert_not_called()
+
+        scan_for_duplicates.apply(task_id='crashed-task-id')
+        scan.assert_called_once()
+        self.assertIsNone(cache.get(key))
+
+    def test_run_does_not_release_a_newer_runs_lock(self):
+        """The lock expired mid-run and another run took it: finishing leaves it alone"""
+        key = scan_for_duplicates.idempotency_key((), {})
+
+        def lock_taken_over(*args, **kwargs):
+            cache.set(key, 'newer-task-id')
+            return 0
+
+        with mock.patch('leads.tasks.scan_duplicates', side_effect=lock_taken_over):
+            scan_for_duplicates.apply(task_id='first-task-id')
+
+        self.assertEqual(cache.get(key), 'newer-task-id')
+
+    def test_lock_outlasts_visibility_timeout(self):
+        visibility_timeout = app.conf.broker_transport_options['visibility_timeout']
+        self.assertGreaterEqual(scan_for_duplicates.get_lock_timeout(), visibility_timeout)
+
+    @mock.patch('leads.tasks.process_due_reminders', return_value=1)
+    def test_idempotency_key_runs_once(self, process):
+        send_due_reminders.apply(headers={'idempotency_key': 'batch-42'})
+        send_due_reminders.apply(headers={'idempotency_key': 'batch-42'})
+        send_due_reminders.apply(headers={'idempotency_key': 'batch-43'})
+
+        self.assertEqual(process.call_count, 2)
@@ -0,0 +1,40 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth.models import User
+
+class TokenBucketThrottleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="staff", password="pass", is_staff=True)
+        self.client = Client()
+        self.client.login(username="staff", password="pass")
+
+    @mock.patch('leads.throttling.get_script')
+    def test_unfiltered_list_costs_more(self, get_script):
+        """Endpoint cost comes from settings, unfiltered lists spend more tokens"""
+        script = get_script.return_value
+        script.return_value = [1, '100', '0']
+
+        self.client.get(reverse('api_lead_list'))
+        self.client.get(reverse('api_lead_list'), {'status': 'new'})
+
+        unfiltered, filtered = [call.kwargs for call in script.call_args_list]
+        self.assertEqual(unfiltered['args'], [120, 2.0, 10, 'lead_list_unfiltered'])
+        self.assertEqual(filtered['args'], [120, 2.0, 1, 'lead_list'])
+        self.assertEqual(unfiltered['keys'][0], f"throttle:bucket:user:{self.user.pk}")
+
+    @mock.patch('leads.throttling.get_script')
+    def test_empty_bucket_rejects(self, get_script):
+        get_script.return_value.return_value = [0, '0.5', '4.25']
+
+        response = self.client.get(reverse('api_lead_list'))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_fails_open_without_redis(self):
+        """A non-Redis cache (or Redis outage) doesn't block the API"""
+        with mock.patch('leads.throttling.get_script', side_effect=NotImplementedError):
+            response = self.client.get(reverse('api_lead_list'))
+        self.assertEqual(response.status_code, 200)
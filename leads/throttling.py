@@ -0,0 +1,124 @@
+"""
+API throttling with Redis token buckets.
+
+Each client (API token, else user, else IP) has a bucket that refills at a
+steady rate. A request spends tokens according to the endpoint's cost, so
+expensive calls (unfiltered full lists) drain the bucket faster than cheap
+ones. The check-and-spend runs as one Lua script inside Redis, using the
+Redis clock, so it is atomic and consistent across every gunicorn worker.
+
+Rejections are counted per endpoint in a Redis hash (see rejection_counts).
+"""
+import hashlib
+import logging
+
+from django.conf import settings
+from django_redis import get_redis_connection
+from redis import RedisError
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "throttle:bucket:{}"
+REJECTIONS_KEY = "throttle:rejections"
+
+# KEYS[1] bucket hash, KEYS[2] rejections hash
+# ARGV: capacity, refill rate (tokens/second), cost, endpoint name
+# Returns {allowed (0/1), tokens left, seconds until the request would fit}
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+    redis.call('HINCRBY', KEYS[2], ARGV[4], 1)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+_script = None
+
+
+def get_script():
+    """Register the Lua script once per process (redis-py then calls it by SHA)."""
+    global _script
+    if _script is None:
+        _script = get_redis_connection('default').register_script(TOKEN_BUCKET_LUA)
+    return _script
+
+
+def rejection_counts():
+    """{endpoint: rejected requests} since the counters were last reset."""
+    counts = get_redis_connection('default').hgetall(REJECTIONS_KEY)
+    return {endpoint.decode(): int(count) for endpoint, count in counts.items()}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle backed by the Redis token bucket.
+
+    Views choose their cost through `throttle_endpoint` (or a
+    get_throttle_endpoint(request) method), looked up in
+    settings.LEAD_API_THROTTLE['costs'].
+    """
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_client(self, request):
+        """(kind, identity) of the caller: API token, else user, else IP."""
+        token = getattr(request.auth, 'key', None)
+        if token:
+            return 'token', hashlib.sha256(token.encode()).hexdigest()[:32]
+        if request.user and request.user.is_authenticated:
+            return 'user', str(request.user.pk)
+        return 'anon', self.get_ident(request)
+
+    def get_endpoint(self, request, view):
+        if hasattr(view, 'get_throttle_endpoint'):
+            return view.get_throttle_endpoint(request)
+        return getattr(view, 'throttle_endpoint', 'default')
+
+    def allow_request(self, request, view):
+        config = settings.LEAD_API_THROTTLE
+        kind, identity = self.get_client(request)
+        capacity, rate = config['rates'][kind]
+        endpoint = self.get_endpoint(request, view)
+        # a cost above the bucket size could never be paid
+        cost = min(config['costs'].get(endpoint, config['costs']['default']), capacity)
+
+        try:
+            allowed, _, retry_after = get_script()(
+                keys=[BUCKET_KEY.format(f"{kind}:{identity}"), REJECTIONS_KEY],
+                args=[capacity, rate, cost, endpoint],
+            )
+        except (RedisError, NotImplementedError):
+            # Fail open: an unreachable Redis shouldn't take the API down with it
+            logger.warning("Throttle check skipped, Redis unavailable")
+            return True
+
+        if int(allowed):
+            return True
+
+        self.retry_after = float(retry_after)
+        logger.info("Throttled %s %s on %s (cost %s)", kind, identity, endpoint, cost)
+        return False
+
+    def wait(self):
+        return self.retry_after
@@ -1,11 +1,15 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('stream/', views.dashboard_stream, name='dashboard_stream'),
+    path('reminders/<int:pk>/dismiss/', views.reminder_dismiss, name='reminder_dismiss'),
     path('list/', views.lead_list, name='lead_list'),
     path('create/', views.lead_create, name='lead_create'),
     path('<int:pk>/update/', views.lead_update, name='lead_update'),
     path('<int:pk>/delete/', views.lead_delete, name='lead_delete'),
+    path('duplicates/', views.duplicate_list, name='duplicate_list'),
+    re_path(r'^duplicates/(?P<pk>[0-9]+)/(?P<action>merge|dismiss)/$', views.duplicate_resolve, name='duplicate_resolve'),
 ]
@@ -1,8 +1,8 @@
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
 from django.db.models import Q, Count
-from django.shortcuts import render, redirect
+from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib import messages
-from .models import ActionLog, Lead, FollowUp
+from .models import ActionLog, DuplicateCandidate, Lead, FollowUp, Reminder
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
@@ -10,9 +10,24 @@ from django.core.cache import cache
 from django.db.models import OuterRef, Subquery
 from django.urls import reverse
 from django.utils.http import urlencode
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.http import StreamingHttpResponse
+from django.conf import settings
+import asyncio
+import json
+from asgiref.sync import sync_to_async
+from .events import event_hub, publish_lead_event
+from .assignment import adjust_load, is_open
+from .dedupe import merge_leads
+from .services import DuplicateEmailError, add_followup, create_lead, update_lead
+from .scoping import assignment_deltas, event_visible, get_scope, has_lead_perm, scope_leads
+from .db_router import replica_reads
+from .fragments import get_generation
 
 #---------------------------------------------------- Dashboard View
 @login_required
+@replica_reads
 def dashboard(request):
     """
     Dashboard view showing recent leads with latest follow-up comments
@@ -21,15 +36,17 @@ def dashboard(request):
 
     query = request.GET.get('q', '')
     status = request.GET.get('status', '')
+    scope = get_scope(request)  # which leads this user may see
 
     # --- CACHE KEYS ---
-    recent_cache_key = f"dashboard_recent_q={query}_status={status}"
-    counts_cache_key = "dashboard_counts"
+    # Partitioned by visibility scope (not per user) so users who see the same leads share entries
+    recent_cache_key = f"dashboard_recent_{scope['key']}_q={query}_status={status}"
+    counts_cache_key = f"dashboard_counts_{scope['key']}"
 
     # --- FETCH RECENT LEADS FROM CACHE ---
     recent_leads = cache.get(recent_cache_key)
     if not recent_leads:
-        leads_qs = Lead.objects.filter(is_deleted=False).order_by('-id')
+        leads_qs = scope_leads(Lead.objects.filter(is_deleted=False), scope).order_by('-id')
         if query:
             leads_qs = leads_qs.filter(
                 Q(name__icontains=query) #|
@@ -66,7 +83,7 @@ def dashboard(request):
             'lost_leads': Lead.objects.filter(status='lost').count(),
         }"""
         # Optimized single query for counts
-        counts = Lead.objects.aggregate(
+        counts = scope_leads(Lead.objects.all(), scope).aggregate(
             total_leads = Count('id'),
             new_leads = Count('id', filter=Q(status='new')),
             in_progress_leads = Count('id', filter=Q(status='in_progress')),
@@ -75,17 +92,82 @@ def dashboard(request):
         )
         cache.set(counts_cache_key, counts, timeout=30)  # cache for 30 seconds
 
+    # --- DUE REMINDERS ---
+    # Not cached: per user, and dismissing one should show right away
+    due_reminders = visible_reminders(request.user, scope).select_related('lead')[:10]
+
     context = {
         'query': query,
         'status': status,
         'recent_leads': recent_leads,
+        'due_reminders': due_reminders,
         **counts
     }
 
     return render(request, 'leads/dashboard.html', context)
 
+def visible_reminders(user, scope):
+    """Undismissed reminders for the user's own leads, and for unassigned leads they can see."""
+    return Reminder.objects.filter(
+        Q(user=user) | Q(user__isnull=True, lead__in=scope_leads(Lead.objects.all(), scope)),
+        dismissed_at__isnull=True,
+        lead__is_deleted=False,
+    )
+
+
+@login_required
+def reminder_dismiss(request, pk):
+    if request.method == "POST":
+        updated = visible_reminders(request.user, get_scope(request)).filter(pk=pk).update(dismissed_at=timezone.now())
+        if not updated:
+            messages.error(request, "Reminder does not exist.")
+    return redirect('dashboard')
+
+#---------------------------------------------------- Dashboard Stream (SSE)
+@login_required
+async def dashboard_stream(request):
+    """
+    Server-Sent Events stream for the dashboard.
+
+    Relays lead events published to Redis (see leads/events.py) to the browser,
+    so an open dashboard updates its counts and recent leads without reloading.
+    Events about leads outside the user's scope are dropped here, they never
+    reach the browser. Must be served by the ASGI app (crm/asgi.py) since the
+    connection stays open.
+    """
+    scope = await sync_to_async(get_scope)(request)  # reads the session
+
+    async def event_stream():
+        # shared per-process subscription (see LeadEventHub)
+        queue = event_hub.subscribe()
+        try:
+            yield "retry: 5000\n\n"  # tell EventSource how long to wait before reconnecting
+            while True:
+                try:
+                    event, raw = await asyncio.wait_for(queue.get(), timeout=settings.LEAD_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    # SSE comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if event['type'] == 'batch_assigned':
+                    # counts only, and different for every scope
+                    deltas = assignment_deltas(event, scope)
+                    if deltas:
+                        data = json.dumps({'type': 'batch_assigned', 'lead': None, 'deltas': deltas})
+                        yield f"event: lead\ndata: {data}\n\n"
+                elif event_visible(event, scope):
+                    yield f"event: lead\ndata: {raw}\n\n"
+        finally:
+            event_hub.unsubscribe(queue)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # disable nginx buffering
+    return response
+
 #---------------------------------------------------- Lead List View
 @login_required
+@replica_reads
 def lead_list(request):
     """
     View to list leads with search, filter, pagination and caching.
@@ -97,32 +179,41 @@ def lead_list(request):
     # --- GET SEARCH PARAMETERS ---
     query = request.GET.get('q', '') # capture the search term entered by user or empty string if none(default)
     status = request.GET.get('status', '') # capture the status filter selected by user or empty string if none(default)
+    scope = get_scope(request)  # which leads this user may see
+    generation = get_generation()  # changes after every lead write (see leads/fragments.py)
 
-    # --- CACHE KEY BASED ON QUERY AND STATUS ---
-    # Unique key for each combination of search query and status
-    cache_key = f"lead_list_q={query}_status={status}_page={request.GET.get('page', 1)}" 
+    # --- CACHE KEY BASED ON SCOPE, QUERY AND STATUS ---
+    # Unique key for each combination of visibility scope, search query and status
+    cache_key = f"lead_list_{scope['key']}_g{generation}_q={query}_status={status}_page={request.GET.get('page', 1)}" 
     # Each different combination gets its own cache entry, so cached results don’t mix up.
 
-    # --- TRY TO FETCH FROM CACHE ---
-    page_obj = cache.get(cache_key)
+    # --- BUILD THE QUERY (lazy, nothing runs yet) ---
+    # Highest priority first, newest first for equal scores (served by lead_score_idx)
+    leads = scope_leads(Lead.objects.filter(is_deleted=False), scope).order_by('-score', '-id')
 
-    if not page_obj:  # If cache miss
-        # --- FETCH FROM DATABASE ---
-        leads = Lead.objects.filter(is_deleted=False).order_by('-id')  # Order by newest first
+    #It returns leads where any of these fields match the search term.
+    if query:
+        leads = leads.filter(
+            Q(name__icontains=query) |
+            Q(email__icontains=query) |
+            Q(phone__icontains=query)
+        )
 
-        #It returns leads where any of these fields match the search term.
-        if query:
-            leads = leads.filter(
-                Q(name__icontains=query) |
-                Q(email__icontains=query) |
-                Q(phone__icontains=query)
-            )
-        
-        if status:
-            leads = leads.filter(status=status)
+    if status:
+        leads = leads.filter(status=status)
+
+    paginator = Paginator(leads, 5)  # 5 leads per page
 
+    # --- TRY TO FETCH FROM CACHE ---
+    # Only the page's rows and the total count are cached, never the Page:
+    # pickling a Page evaluates its paginator's whole queryset.
+    cached = cache.get(cache_key)
+
+    if cached is not None:
+        paginator.count = cached['count']  # count is a cached_property, this skips the COUNT query
+        page_obj = Page(cached['rows'], cached['number'], paginator)
+    else:  # If cache miss
         # --- PAGINATION ---
-        paginator = Paginator(leads, 5)  # 5 leads per page
         page_number = request.GET.get('page') # store current page number from the url if not present defaults to 1
         page_obj = paginator.get_page(page_number)
         # get_page handles invalid page numbers automatically
@@ -130,19 +221,34 @@ def lead_list(request):
         """page_obj contains:
             The leads for this page
             Pagination info (total pages, has next/previous page)"""
+        page_obj.object_list = list(page_obj.object_list)  # fetch this page's rows only
 
-        # --- STORE PAGE IN CACHE ---
+        # --- STORE ROWS AND COUNT IN CACHE ---
         # Timeout 30 seconds (we can increase later if needed)
-        cache.set(cache_key, page_obj, timeout=30)
+        cache.set(cache_key, {
+            'rows': page_obj.object_list,
+            'count': paginator.count,
+            'number': page_obj.number,
+        }, timeout=30)
 
     """Prepares a context dictionary to send data to the template:
         'page_obj' → the current page of leads (for pagination in template)
+        'page_range' → page numbers around the current one (for the pagination widget)
         'query' → the current search term (to show in search box)
         'status' → the selected status filter (to keep it selected in the UI)"""
+    # --- WINDOWED PAGINATION ---
+    # 1 … 4 5 [6] 7 8 … 2000 instead of a link for every page
+    page_range = list(page_obj.paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1))
+
     context = {
         'page_obj': page_obj,
+        'page_range': page_range,
         'query': query,
         'status': status,
+        # fragment caches in the template are keyed on these (see leads/fragments.py)
+        'scope_key': scope['key'],
+        'cache_generation': generation,
+        'fragment_timeout': settings.LEAD_FRAGMENT_CACHE_TIMEOUT,
     }
 
     return render(request, 'leads/lead_list.html', context)
@@ -151,7 +257,7 @@ def lead_list(request):
 #---------------------------------------------------- Lead Create View
 @login_required
 def lead_create(request):
-    if not request.user.has_perm('leads.add_lead'):
+    if not has_lead_perm(request, 'leads.add_lead'):
         messages.error(request, "You do not have permission to create leads.")
         return redirect('lead_list')
     """if not request.user.is_superuser:
@@ -179,28 +285,27 @@ def lead_create(request):
             messages.error(request, "A user with this email already exists.")
             return redirect("lead_create")
 
-        lead = Lead.objects.create(name=name, email=email, phone=phone)
+        try:
+            lead, duplicates = create_lead(request.user, name, email, phone)
+        except DuplicateEmailError:
+            # created by someone else since the check above
+            messages.error(request, "A user with this email already exists.")
+            return redirect("lead_create")
         messages.success(request, "Lead created successfully!")
-
-        # Action Log for create action
-        ActionLog.objects.create(
-            user=request.user,
-            action='create',
-            lead=lead,
-            comment=f"Lead created with name: {name}, email: {email}, phone: {phone}"
-        )
+        if duplicates:
+            messages.warning(request, "Possible duplicate of: " + ", ".join(d.name for d in duplicates[:3]) + ".")
         return redirect('lead_list')
     return render(request, 'leads/lead_create.html')
 
 #---------------------------------------------------- Lead Update View
 @login_required
 def lead_update(request, pk):
-    if not request.user.has_perm('leads.change_lead'):
+    if not has_lead_perm(request, 'leads.change_lead'):
         messages.error(request, "You do not have permission to update leads.")
         return redirect('lead_list')
 
     try:
-        lead = Lead.objects.get(pk=pk, is_deleted=False)
+        lead = scope_leads(Lead.objects.all(), get_scope(request)).get(pk=pk, is_deleted=False)
     except Lead.DoesNotExist:
         messages.error(request, "Lead does not exist.")
         return redirect("lead_list")
@@ -214,6 +319,7 @@ def lead_update(request, pk):
         phone = request.POST.get('phone', '').strip()
         status = request.POST.get('status', '').strip()
         followup_text = request.POST.get('comment', '').strip()  # follow-up input
+        next_followup_raw = request.POST.get('next_followup_at', '').strip()  # empty clears the reminder
 
         # Validation
         if not name or not email or not phone:
@@ -228,12 +334,25 @@ def lead_update(request, pk):
             messages.error(request, f"Phone number must be 10 digits long. Current digits: {len(phone)}.")
             return redirect("lead_update", pk=pk)
 
+        next_followup_at = None
+        if next_followup_raw:
+            next_followup_at = parse_datetime(next_followup_raw)
+            if next_followup_at is None:
+                messages.error(request, "Next follow-up must be a valid date and time.")
+                return redirect("lead_update", pk=pk)
+            if timezone.is_naive(next_followup_at):
+                next_followup_at = timezone.make_aware(next_followup_at)
+            # The form only has minute precision, an untouched field isn't a change
+            if lead.next_followup_at and next_followup_at == lead.next_followup_at.replace(second=0, microsecond=0):
+                next_followup_at = lead.next_followup_at
+
         # Check if any Lead field has changed
         lead_changed = (
             name != lead.name or
             email != lead.email or
             phone != lead.phone or
-            status != lead.status
+            status != lead.status or
+            next_followup_at != lead.next_followup_at
         )
 
         # Check if follow-up input is provided
@@ -246,41 +365,22 @@ def lead_update(request, pk):
 
         # Update Lead fields if changed
         if lead_changed:
-            changed_fields = []
-            if name != lead.name: changed_fields.append(f"name: {lead.name} -> {name}")
-            if email != lead.email: changed_fields.append(f"email: {lead.email} -> {email}")
-            if phone != lead.phone: changed_fields.append(f"phone: {lead.phone} -> {phone}")
-            if status != lead.status: changed_fields.append(f"status: {lead.status} -> {status}")
-        
-            lead.name = name
-            lead.email = email
-            lead.phone = phone
-            lead.status = status
-            lead.save()
-
-        # Audit Log for update action
-            ActionLog.objects.create(
-                user=request.user,
-                action='update',
-                lead=lead,
-                comment=f"Updated fields: {', '.join(changed_fields)}"
-            )
+            try:
+                update_lead(lead, request.user, {
+                    'name': name,
+                    'email': email,
+                    'phone': phone,
+                    'status': status,
+                    'next_followup_at': next_followup_at,
+                })
+            except DuplicateEmailError:
+                # taken by someone else since the form was checked
+                messages.error(request, "A user with this email already exists.")
+                return redirect("lead_update", pk=pk)
 
         # Create new FollowUp if provided
         if followup_changed:
-            FollowUp.objects.create(
-                lead=lead,
-                user=request.user,
-                comment=followup_text
-            )
-            
-            # Audit Log for follow-up action
-            ActionLog.objects.create(
-                user=request.user,
-                action='followup',
-                lead=lead,
-                comment=followup_text
-            )
+            add_followup(lead, request.user, followup_text)
 
         messages.success(request, "Lead updated successfully!")
         return redirect('lead_list')
@@ -314,21 +414,26 @@ def lead_update(request, pk):
 #---------------------------------------------------- Lead Delete View
 @login_required
 def lead_delete(request, pk):
-    if not request.user.is_superuser:
+    if not has_lead_perm(request, 'leads.delete_lead'):
         messages.error(request, "You do not have permission to delete leads.")
         return redirect('lead_list')
-    
-    try:
-        lead = Lead.objects.get(pk=pk)
-    except Lead.DoesNotExist:
-        messages.error(request, "Lead does not exist.")
-        return redirect("lead_list")
-    
+
+    # a lead outside the user's scope is a 404, same as one that doesn't exist
+    lead = get_object_or_404(scope_leads(Lead.objects.filter(is_deleted=False), get_scope(request)), pk=pk)
+
     if request.method == "POST":
         # Soft delete by setting is_deleted to True
+        was_open = is_open(lead.status, lead.is_deleted)
         lead.is_deleted = True
+        lead.next_followup_at = None  # deleted leads don't need reminders
         lead.save()
 
+        if was_open:
+            adjust_load(lead.assigned_to_id, -1)
+
+        # nothing left to follow up on
+        Reminder.objects.filter(lead=lead, dismissed_at__isnull=True).update(dismissed_at=timezone.now())
+
         # Action Log for delete action
         ActionLog.objects.create(
             user=request.user,
@@ -337,11 +442,64 @@ def lead_delete(request, pk):
             comment=f"Lead deleted: (Name: {lead.name}) (ID: {lead.id})"
         )
 
+        # No count deltas: the dashboard counts include soft-deleted leads,
+        # the dashboard only drops the row from recent leads
+        publish_lead_event('deleted', lead)
+
         messages.success(request, "Lead deleted successfully!")
         return redirect('lead_list')
 
     return render(request, 'leads/lead_delete.html', {'lead': lead})
 
+#---------------------------------------------------- Duplicate Leads
+@login_required
+def duplicate_list(request):
+    """Pending duplicate pairs found on create or by the batch scan, best match first."""
+    if not has_lead_perm(request, 'leads.change_lead'):
+        messages.error(request, "You do not have permission to review duplicates.")
+        return redirect('lead_list')
+
+    # both leads of a pair must be visible, the page shows their contact details
+    visible = scope_leads(Lead.objects.filter(is_deleted=False), get_scope(request))
+    candidates = DuplicateCandidate.objects.filter(
+        status='pending', lead__in=visible, duplicate_of__in=visible,
+    ).select_related('lead', 'duplicate_of')
+
+    paginator = Paginator(candidates, 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'leads/duplicate_list.html', {'page_obj': page_obj})
+
+
+@login_required
+def duplicate_resolve(request, pk, action):
+    """Merge the newer lead of a pair into the older one, or dismiss the pair."""
+    # merging soft deletes a lead, same rule as lead_delete
+    if not has_lead_perm(request, 'leads.delete_lead'):
+        messages.error(request, "You do not have permission to merge leads.")
+        return redirect('duplicate_list')
+
+    if request.method != "POST":
+        return redirect('duplicate_list')
+
+    try:
+        # same pairs as duplicate_list: both leads active and visible
+        visible = scope_leads(Lead.objects.filter(is_deleted=False), get_scope(request))
+        candidate = DuplicateCandidate.objects.select_related('lead', 'duplicate_of').get(
+            pk=pk, status='pending', lead__in=visible, duplicate_of__in=visible,
+        )
+    except DuplicateCandidate.DoesNotExist:
+        messages.error(request, "Duplicate pair does not exist.")
+        return redirect('duplicate_list')
+
+    if action == 'merge':
+        merge_leads(candidate.lead, candidate.duplicate_of, request.user)
+        messages.success(request, f"Merged {candidate.lead.name} into {candidate.duplicate_of.name}.")
+    elif action == 'dismiss':
+        candidate.status = 'dismissed'
+        candidate.save(update_fields=['status'])
+        messages.info(request, "Marked as not a duplicate.")
+    return redirect('duplicate_list')
+
 # Logout View
 def logout_view(request):
     logout(request)